@@ -83,6 +83,8 @@ from .voice_matcher import (
 from .controller import (
     TTSPipelineController,
     create_tts_pipeline,
+    session_output_dir,
+    MERGED_AUDIO_FILENAME,
 )
 
 # 工具
@@ -140,6 +142,8 @@ __all__ = [
     # Controller
     "TTSPipelineController",
     "create_tts_pipeline",
+    "session_output_dir",
+    "MERGED_AUDIO_FILENAME",
     # Prompts
     "DIALOGUE_ANALYZER_SYSTEM_PROMPT",
     "DIALOGUE_ANALYZER_REFINE_PROMPT",
@@ -6,7 +6,7 @@
 """
 
 import os
-import uuid
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
@@ -17,10 +17,20 @@ from .voice_matcher import VoiceMatcherAgent, create_voice_matcher
 from .models import SessionStatus, DialogueItem, VoiceMapping
 from .tools import tts_synthesize, tts_synthesize_batch, audio_merge
 from .session_service import TTSSessionService
+from backend.models import generate_session_id
 
 logger = logging.getLogger(__name__)
 
 
+# 合并音频在会话输出目录中的固定文件名
+MERGED_AUDIO_FILENAME = "dialogue_full.mp3"
+
+
+def session_output_dir(session_id: str) -> str:
+    """会话音频的默认输出目录（按约定由 session_id 推导，无需加载会话）"""
+    return os.path.join(os.path.expanduser("~"), ".tts_agent", session_id)
+
+
 class TTSPipelineController:
     """
     TTS 三阶段流水线控制器
@@ -61,7 +71,7 @@ class TTSPipelineController:
             self.session_id = session_id or result["session_id"]
             self._db_id = result["db_id"]
         else:
-            self.session_id = session_id or str(uuid.uuid4())
+            self.session_id = session_id or generate_session_id()
         
         self.status = SessionStatus.CREATED
         self.created_at = datetime.now()
@@ -74,9 +84,7 @@ class TTSPipelineController:
         self.audio_files: List[str] = []
         self.merged_audio: Optional[str] = None
         
-        self.output_dir = output_dir or os.path.join(
-            os.path.expanduser("~"), ".tts_agent", self.session_id
-        )
+        self.output_dir = output_dir or session_output_dir(self.session_id)
         os.makedirs(self.output_dir, exist_ok=True)
         
         self.error: Optional[str] = None
@@ -100,12 +108,10 @@ class TTSPipelineController:
         self.merged_audio = data.get("merged_audio_path")
         self.error = data.get("error")
         
-        created_at = data.get("created_at")
-        updated_at = data.get("updated_at")
-        self.created_at = datetime.fromisoformat(created_at) if created_at else datetime.now()
-        self.updated_at = datetime.fromisoformat(updated_at) if updated_at else datetime.now()
+        self.created_at = data.get("created_at") or datetime.now()
+        self.updated_at = data.get("updated_at") or datetime.now()
         
-        self.output_dir = os.path.join(os.path.expanduser("~"), ".tts_agent", session_uuid)
+        self.output_dir = session_output_dir(session_uuid)
         os.makedirs(self.output_dir, exist_ok=True)
         
         return True
@@ -152,9 +158,18 @@ class TTSPipelineController:
                 item.pop("audio_path", None)
                 item.pop("duration_ms", None)
     
+    def _discard_merged_audio(self):
+        """删除旧的合并音频，接口按目录约定查找文件，不能留下过期结果"""
+        if self.merged_audio:
+            try:
+                os.remove(self.merged_audio)
+            except FileNotFoundError:
+                pass
+        self.merged_audio = None
+    
     def _clear_audio_results(self):
         self.audio_files = []
-        self.merged_audio = None
+        self._discard_merged_audio()
         if self.persist and self._service:
             self._service.clear_stage3_result(self.session_id)
     
@@ -468,7 +483,7 @@ class TTSPipelineController:
                     "filename": f"dialogue_{index:03d}_{char}.mp3",
                 })
             
-            result = tts_synthesize_batch.invoke({
+            result = await asyncio.to_thread(tts_synthesize_batch.invoke, {
                 "items": items,
                 "output_dir": self.output_dir,
             })
@@ -483,12 +498,13 @@ class TTSPipelineController:
                             "index": r.get("index"),
                             "audio_path": r["audio_path"],
                             "duration_ms": r.get("duration_ms") or 0,
+                            "audio_hash": r.get("audio_hash"),
                         })
                 
                 merged_total_duration_ms = None
                 if self.audio_files:
-                    merged_path = os.path.join(self.output_dir, "dialogue_full.mp3")
-                    merge_result = audio_merge.invoke({
+                    merged_path = os.path.join(self.output_dir, MERGED_AUDIO_FILENAME)
+                    merge_result = await asyncio.to_thread(audio_merge.invoke, {
                         "audio_paths": self.audio_files,
                         "output_path": merged_path,
                     })
@@ -554,6 +570,33 @@ class TTSPipelineController:
             logger.exception("stage3_synthesize failed")
             return {"success": False, "error": str(e)}
     
+    # ========================================================================
+    # 全流程
+    # ========================================================================
+    
+    async def run_all(
+        self,
+        user_input: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        on_stage: Optional[Callable[[int], None]] = None,
+    ) -> Dict[str, Any]:
+        """一次性执行分析 → 匹配 → 合成三个阶段，任一阶段失败即停止"""
+        stages = (
+            (1, lambda: self.stage1_analyze(user_input, on_chunk=on_chunk)),
+            (2, lambda: self.stage2_match(on_chunk=on_chunk)),
+            (3, self.stage3_synthesize),
+        )
+        
+        result: Dict[str, Any] = {}
+        for stage, run_stage in stages:
+            if on_stage:
+                on_stage(stage)
+            result = await run_stage()
+            if not result.get("success"):
+                break
+        
+        return {**result, "stage": stage}
+    
     # ========================================================================
     # 会话管理
     # ========================================================================
@@ -572,8 +615,8 @@ class TTSPipelineController:
             "merged_audio": self.merged_audio,
             "output_dir": self.output_dir,
             "error": self.error,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
     
     def to_dict(self) -> Dict[str, Any]:
@@ -590,8 +633,8 @@ class TTSPipelineController:
             "merged_audio": self.merged_audio,
             "output_dir": self.output_dir,
             "error": self.error,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
     
     def reset(self):
@@ -602,7 +645,7 @@ class TTSPipelineController:
         self.dialogue_list = []
         self.voice_mapping = []
         self.audio_files = []
-        self.merged_audio = None
+        self._discard_merged_audio()
         self.error = None
         self.updated_at = datetime.now()
         
@@ -637,4 +680,6 @@ __all__ = [
     "TTSPipelineController",
     "SessionStatus",
     "create_tts_pipeline",
+    "session_output_dir",
+    "MERGED_AUDIO_FILENAME",
 ]
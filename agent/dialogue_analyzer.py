@@ -13,6 +13,8 @@ import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
 
+import orjson
+
 os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
 os.environ.setdefault("LANGSMITH_TRACING", "false")
 
@@ -21,9 +23,12 @@ from langchain_core.tools import tool
 
 from .prompts import DIALOGUE_ANALYZER_SYSTEM_PROMPT
 from .models import DialogueItem, InputType, parse_dialogue_list
+from .llm_stream import collect_llm_stream
 
 logger = logging.getLogger(__name__)
 
+_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*\n?([\s\S]*?)\n?```')
+
 
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """从文本中提取 JSON 对象"""
@@ -35,9 +40,7 @@ def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     except json.JSONDecodeError:
         pass
     
-    code_block_pattern = r'```(?:json)?\s*\n?([\s\S]*?)\n?```'
-    matches = re.findall(code_block_pattern, text)
-    for match in matches:
+    for match in _CODE_BLOCK_RE.findall(text):
         try:
             return json.loads(match.strip())
         except json.JSONDecodeError:
@@ -230,22 +233,13 @@ class DialogueAnalyzerAgent:
             return result["messages"][-1].content
         return str(result)
     
-    def _stream_direct(self, prompt: str, system_prompt: Optional[str] = None):
-        """直接调用 LLM 流式输出"""
-        from langchain_core.messages import HumanMessage, SystemMessage
-        
-        messages = []
-        
-        if system_prompt:
-            messages.append(SystemMessage(content=system_prompt))
-        else:
-            messages.append(SystemMessage(content=self._build_system_prompt()))
-        
-        messages.append(HumanMessage(content=prompt))
-        
-        for chunk in self.llm.stream(messages):
-            if hasattr(chunk, 'content') and chunk.content:
-                yield chunk.content
+    async def _collect_stream(
+        self,
+        prompt: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """消费 LLM 异步流式输出并拼接，分片到达时实时回调 on_chunk"""
+        return await collect_llm_stream(self.llm, self._build_system_prompt(), prompt, on_chunk=on_chunk)
     
     async def analyze(self, user_input: str) -> Dict[str, Any]:
         """分析用户输入"""
@@ -285,13 +279,7 @@ class DialogueAnalyzerAgent:
         
         self.new_session()
         
-        response_parts: List[str] = []
-        for chunk in self._stream_direct(prompt):
-            response_parts.append(chunk)
-            if on_chunk:
-                on_chunk(chunk)
-        
-        response_text = "".join(response_parts)
+        response_text = await self._collect_stream(prompt, on_chunk)
         return self._parse_json_result(response_text)
     
     def _parse_json_result(self, response_text: str) -> Dict[str, Any]:
@@ -337,7 +325,7 @@ class DialogueAnalyzerAgent:
 
 ## 当前对话列表
 ```json
-{json.dumps(dialogue_list, ensure_ascii=False, indent=2)}
+{orjson.dumps(dialogue_list).decode()}
 ```
 
 ## 修改指令
@@ -347,11 +335,7 @@ class DialogueAnalyzerAgent:
 
 修改完成后，输出完整的 JSON 对话列表。"""
         
-        response_parts: List[str] = []
-        for chunk in self._stream_direct(prompt):
-            response_parts.append(chunk)
-        
-        response_text = "".join(response_parts)
+        response_text = await self._collect_stream(prompt)
         extracted = extract_json_from_text(response_text)
         
         if extracted:
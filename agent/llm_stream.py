@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 流式输出工具
+
+对话分析和音色匹配两个 Agent 共用的流式调用与拼接逻辑。
+"""
+
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+# LLM 流式分片合并阈值：累计字符数达到阈值或以换行/闭合括号结尾时输出
+_STREAM_FLUSH_CHARS = 40
+_STREAM_FLUSH_SUFFIXES = ("\n", "}", "]")
+
+
+async def astream_llm_text(llm: Any, system_prompt: str, prompt: str) -> AsyncIterator[str]:
+    """直接调用 LLM 异步流式输出，在源头合并细碎 token，减少下游拼接、回调和 SSE 帧的次数"""
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    messages = [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+
+    pending: List[str] = []
+    pending_len = 0
+    async for chunk in llm.astream(messages):
+        if hasattr(chunk, 'content') and chunk.content:
+            content = chunk.content
+            pending.append(content)
+            pending_len += len(content)
+            if pending_len >= _STREAM_FLUSH_CHARS or content.endswith(_STREAM_FLUSH_SUFFIXES):
+                yield "".join(pending)
+                pending.clear()
+                pending_len = 0
+    if pending:
+        yield "".join(pending)
+
+
+async def collect_llm_stream(
+    llm: Any,
+    system_prompt: str,
+    prompt: str,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    stop: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    消费 LLM 异步流式输出并拼接，分片到达时实时回调 on_chunk
+
+    stop 对某个分片返回 True 时停止读取剩余输出（已收到的部分照常返回）。
+    """
+    response_parts: List[str] = []
+    stream = astream_llm_text(llm, system_prompt, prompt)
+    try:
+        async for chunk in stream:
+            response_parts.append(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+            if stop and stop(chunk):
+                break
+    finally:
+        await stream.aclose()
+    return "".join(response_parts)
+
+
+__all__ = [
+    "astream_llm_text",
+    "collect_llm_stream",
+]
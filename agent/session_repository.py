@@ -8,7 +8,8 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session, selectinload, undefer_group
 
 from backend.models import (
     TTSSession,
@@ -87,9 +88,13 @@ class TTSSessionRepository:
             return tts_session
     
     def get_full_session(self, session_uuid: str) -> Optional[Dict[str, Any]]:
-        """获取完整会话数据"""
+        """获取完整会话数据（对话条目与音色映射各用一条 IN 查询批量加载）"""
         with self._get_session() as session:
-            tts_session = session.query(TTSSession).filter(
+            tts_session = session.query(TTSSession).options(
+                undefer_group("blobs"),
+                selectinload(TTSSession.dialogue_items).undefer_group("blobs"),
+                selectinload(TTSSession.voice_mappings).undefer_group("blobs"),
+            ).filter(
                 TTSSession.session_id == session_uuid
             ).first()
             
@@ -109,6 +114,7 @@ class TTSSessionRepository:
                     "context": item["context"] or "",
                     "audio_path": item["audio_path"],
                     "duration_ms": item["duration_ms"],
+                    "audio_hash": item["audio_hash"],
                 }
                 for item in result.get("dialogue_items", [])
             ]
@@ -209,9 +215,17 @@ class TTSSessionRepository:
         limit: int = 50,
         offset: int = 0,
     ) -> List[Dict[str, Any]]:
-        """列出会话"""
+        """列出会话（只查询列表所需的列，不构建 ORM 对象）"""
         with self._get_session() as session:
-            query = session.query(TTSSession)
+            query = session.query(
+                TTSSession.id,
+                TTSSession.session_id,
+                TTSSession.status,
+                func.substr(TTSSession.user_input, 1, 100).label("user_input"),
+                TTSSession.input_type,
+                TTSSession.created_at,
+                TTSSession.updated_at,
+            )
             
             if project_id is not None:
                 query = query.filter(TTSSession.project_id == project_id)
@@ -221,19 +235,19 @@ class TTSSessionRepository:
             query = query.order_by(TTSSession.created_at.desc())
             query = query.limit(limit).offset(offset)
             
-            sessions = query.all()
+            rows = query.all()
             
             return [
                 {
                     "id": s.id,
                     "session_id": s.session_id,
                     "status": s.status,
-                    "user_input": s.user_input[:100] if s.user_input else None,
+                    "user_input": s.user_input or None,
                     "input_type": s.input_type,
-                    "created_at": s.created_at.isoformat() if s.created_at else None,
-                    "updated_at": s.updated_at.isoformat() if s.updated_at else None,
+                    "created_at": s.created_at,
+                    "updated_at": s.updated_at,
                 }
-                for s in sessions
+                for s in rows
             ]
     
     def save_dialogue_list(
@@ -241,41 +255,37 @@ class TTSSessionRepository:
         session_db_id: int,
         dialogue_list: List[Dict[str, Any]],
         replace: bool = True,
-    ) -> List[TTSDialogueItem]:
-        """保存对话列表"""
+    ) -> int:
+        """保存对话列表，返回写入条数"""
         with self._get_session() as session:
             if replace:
                 session.query(TTSDialogueItem).filter(
                     TTSDialogueItem.session_id == session_db_id
                 ).delete()
             
-            items = []
-            for i, item_data in enumerate(dialogue_list):
-                item = TTSDialogueItem(
-                    session_id=session_db_id,
-                    index=item_data.get("index", i + 1),
-                    character=item_data.get("character", ""),
-                    character_desc=item_data.get("character_desc", ""),
-                    text=item_data.get("text", ""),
-                    instruction=item_data.get("instruction", ""),
-                    context=item_data.get("context", ""),
-                    audio_path=item_data.get("audio_path"),
-                    duration_ms=item_data.get("duration_ms"),
-                )
-                session.add(item)
-                items.append(item)
-            
-            session.flush()
-            
-            for item in items:
-                session.expunge(item)
+            rows = [
+                {
+                    "session_id": session_db_id,
+                    "index": item_data.get("index", i + 1),
+                    "character": item_data.get("character", ""),
+                    "character_desc": item_data.get("character_desc", ""),
+                    "text": item_data.get("text", ""),
+                    "instruction": item_data.get("instruction", ""),
+                    "context": item_data.get("context", ""),
+                    "audio_path": item_data.get("audio_path"),
+                    "duration_ms": item_data.get("duration_ms"),
+                }
+                for i, item_data in enumerate(dialogue_list)
+            ]
             
-            return items
+            return TTSDialogueItem.bulk_create(session, rows)
     
     def get_dialogue_list(self, session_db_id: int) -> List[Dict[str, Any]]:
         """获取对话列表"""
         with self._get_session() as session:
-            items = session.query(TTSDialogueItem).filter(
+            items = session.query(TTSDialogueItem).options(
+                undefer_group("blobs"),
+            ).filter(
                 TTSDialogueItem.session_id == session_db_id
             ).order_by(TTSDialogueItem.index).all()
             
@@ -290,6 +300,7 @@ class TTSSessionRepository:
                     "context": item.context or "",
                     "audio_path": item.audio_path,
                     "duration_ms": item.duration_ms,
+                    "audio_hash": item.audio_hash,
                 }
                 for item in items
             ]
@@ -316,6 +327,31 @@ class TTSSessionRepository:
             
             return True
     
+    def update_dialogue_audio_bulk(self, updates: List[Dict[str, Any]]) -> int:
+        """
+        批量更新对话音频路径（按主键的 executemany UPDATE，一个事务完成）
+        
+        Args:
+            updates: [{"id": ..., "audio_path": ..., "duration_ms": ..., "audio_hash": ...}]，
+                duration_ms 为 None 时不更新；audio_hash 总是随音频一起写入，为 None 时清空旧哈希
+        
+        Returns:
+            更新的行数
+        """
+        if not updates:
+            return 0
+        now = datetime.utcnow()
+        rows = []
+        for u in updates:
+            row = {"id": u["id"], "audio_path": u["audio_path"], "updated_at": now}
+            if u.get("duration_ms") is not None:
+                row["duration_ms"] = u["duration_ms"]
+            row["audio_hash"] = u.get("audio_hash")
+            rows.append(row)
+        with self._get_session() as session:
+            session.execute(update(TTSDialogueItem), rows)
+        return len(rows)
+    
     def clear_dialogue_audio(self, session_db_id: int) -> bool:
         """清空会话下所有对话条目的音频信息"""
         with self._get_session() as session:
@@ -325,6 +361,7 @@ class TTSSessionRepository:
                 {
                     TTSDialogueItem.audio_path: None,
                     TTSDialogueItem.duration_ms: None,
+                    TTSDialogueItem.audio_hash: None,
                     TTSDialogueItem.updated_at: datetime.utcnow(),
                 },
                 synchronize_session=False,
@@ -368,7 +405,9 @@ class TTSSessionRepository:
     def get_voice_mapping(self, session_db_id: int) -> List[Dict[str, Any]]:
         """获取音色映射"""
         with self._get_session() as session:
-            mappings = session.query(TTSVoiceMapping).filter(
+            mappings = session.query(TTSVoiceMapping).options(
+                undefer_group("blobs"),
+            ).filter(
                 TTSVoiceMapping.session_id == session_db_id
             ).all()
             
@@ -37,7 +37,7 @@ class TTSSessionService:
             "session_id": tts_session.session_id,
             "db_id": tts_session.id,
             "status": tts_session.status,
-            "created_at": tts_session.created_at.isoformat() if tts_session.created_at else None,
+            "created_at": tts_session.created_at,
         }
     
     def load_session(self, session_uuid: str) -> Optional[Dict[str, Any]]:
@@ -49,6 +49,31 @@ class TTSSessionService:
         
         return data
     
+    def get_session_dict(self, session_uuid: str) -> Optional[Dict[str, Any]]:
+        """
+        只读获取会话数据，字段与 TTSPipelineController.to_dict 一致（output_dir 除外）
+        
+        用于状态查询，无需构建 pipeline。
+        """
+        data = self.load_session(session_uuid)
+        if not data:
+            return None
+        
+        return {
+            "session_id": data["session_id"],
+            "db_id": data["db_id"],
+            "status": data.get("status") or SessionStatus.CREATED.value,
+            "user_input": data.get("user_input"),
+            "input_type": data.get("input_type"),
+            "dialogue_list": data.get("dialogue_list", []),
+            "voice_mapping": data.get("voice_mapping", []),
+            "audio_files": data.get("audio_files", []),
+            "merged_audio": data.get("merged_audio_path"),
+            "error": data.get("error"),
+            "created_at": data.get("created_at"),
+            "updated_at": data.get("updated_at"),
+        }
+    
     def delete_session(self, session_uuid: str) -> bool:
         """删除会话"""
         return self.repo.delete_by_uuid(session_uuid)
@@ -74,6 +99,7 @@ class TTSSessionService:
             cleaned = dict(item)
             cleaned.pop("audio_path", None)
             cleaned.pop("duration_ms", None)
+            cleaned.pop("audio_hash", None)
             cleaned_list.append(cleaned)
         self.repo.save_dialogue_list(tts_session.id, cleaned_list)
         
@@ -127,22 +153,26 @@ class TTSSessionService:
         
         dialogue_list = self.repo.get_dialogue_list(tts_session.id)
         
+        updates = []
         if audio_results:
             for result in audio_results:
                 result_index = result.get("index")
-                audio_path = result.get("audio_path")
-                duration_ms = result.get("duration_ms")
-                
                 if result_index is not None and result_index < len(dialogue_list):
                     item_id = dialogue_list[result_index].get("id")
                     if item_id:
-                        self.repo.update_dialogue_audio(item_id, audio_path, duration_ms)
+                        updates.append({
+                            "id": item_id,
+                            "audio_path": result.get("audio_path"),
+                            "duration_ms": result.get("duration_ms"),
+                            "audio_hash": result.get("audio_hash"),
+                        })
         else:
             for i, audio_path in enumerate(audio_files):
                 if i < len(dialogue_list):
                     item_id = dialogue_list[i].get("id")
                     if item_id:
-                        self.repo.update_dialogue_audio(item_id, audio_path, None)
+                        updates.append({"id": item_id, "audio_path": audio_path, "duration_ms": None})
+        self.repo.update_dialogue_audio_bulk(updates)
         
         if merged_audio:
             self.repo.update_merged_audio(tts_session.id, merged_audio, total_duration_ms)
@@ -8,6 +8,8 @@
 import os
 import uuid
 import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
@@ -30,7 +32,11 @@ load_dotenv()
 DEFAULT_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "tts_agent_output")
 os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
 
+# 独立合成时的最大并发请求数（受 TTS 接口 QPS 配额约束）
+BATCH_SYNTHESIS_CONCURRENCY = int(os.getenv("TTS_BATCH_CONCURRENCY", "8"))
 
+
+@lru_cache(maxsize=512)
 def _get_resource_id(voice_id: str) -> str:
     """根据音色 ID 自动选择正确的资源 ID"""
     voice_lower = voice_id.lower()
@@ -59,6 +65,12 @@ def _get_tts_service(voice_id: str = None):
     return DoubaoTTSService(resource_id=resource_id), TTSConfig
 
 
+def _split_output_path(output_path: str) -> tuple[str, str]:
+    """把输出文件路径拆成 synthesize_to_file 的 (output_dir, filename)，扩展名由编码决定"""
+    directory, name = os.path.split(output_path)
+    return directory or ".", os.path.splitext(name)[0]
+
+
 @tool
 def tts_preview(
     text: str,
@@ -81,18 +93,18 @@ def tts_preview(
         config = TTSConfig(voice_type=voice_id)
         
         out_dir = output_dir or DEFAULT_OUTPUT_DIR
-        os.makedirs(out_dir, exist_ok=True)
-        
-        filename = f"preview_{uuid.uuid4().hex[:8]}.mp3"
-        output_path = os.path.join(out_dir, filename)
         
-        result = service.synthesize_auto(text=text, config=config, output_path=output_path)
+        # 同一音色反复试听同一句文本很常见，命中缓存时不再请求接口
+        result = service.synthesize_to_file(
+            text, config, output_dir=out_dir, filename=f"preview_{uuid.uuid4().hex[:8]}", auto=True,
+        )
         
         if result.success:
             return {
                 "success": True,
-                "audio_path": result.audio_path or output_path,
+                "audio_path": result.audio_path,
                 "duration_ms": result.duration_ms,
+                "cached": result.cached,
             }
         else:
             return {"success": False, "error": result.error_message or "合成失败"}
@@ -122,17 +134,16 @@ def tts_synthesize(
         config = TTSConfig(voice_type=voice_id)
         
         if not output_path:
-            os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
-            filename = f"synth_{uuid.uuid4().hex[:8]}.mp3"
-            output_path = os.path.join(DEFAULT_OUTPUT_DIR, filename)
+            output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"synth_{uuid.uuid4().hex[:8]}.mp3")
         
-        result = service.synthesize_auto(text=text, config=config, output_path=output_path)
+        result = service.synthesize_to_file(text, config, *_split_output_path(output_path), auto=True)
         
         if result.success:
             return {
                 "success": True,
-                "audio_path": result.audio_path or output_path,
+                "audio_path": result.audio_path,
                 "duration_ms": result.duration_ms,
+                "cached": result.cached,
             }
         else:
             return {"success": False, "error": result.error_message or "合成失败"}
@@ -179,63 +190,101 @@ def tts_synthesize_batch(
 
 
 def _synthesize_batch_multi_turn(items: List[Dict[str, Any]], out_dir: str) -> Dict[str, Any]:
-    """使用 MultiTurnTTSSession 进行批量合成"""
+    """
+    使用 MultiTurnTTSSession 进行批量合成
+    
+    只有 2.0 音色需要按顺序串联 section_id，在会话中逐句合成；
+    1.0 音色各句互不依赖，提交到有界线程池与 2.0 链并行合成。
+    """
     from backend.services import DoubaoTTSService, MultiTurnTTSSession
+    from backend.models import TTSConfig, detect_voice_version
     
     tts = DoubaoTTSService()
-    session = MultiTurnTTSSession(tts, output_dir=out_dir)
-    
-    results = []
-    succeeded = 0
-    failed = 0
     
-    for i, item in enumerate(items):
-        text = item.get("text", "")
-        voice_id = item.get("voice_id", "")
-        instruction = item.get("instruction", "")
-        emotion = item.get("emotion")
-        emotion_scale = item.get("emotion_scale")
-        filename = item.get("filename", f"dialogue_{i+1:03d}.mp3")
-        reset_context = item.get("reset_context", False)
-        
-        if not text or not voice_id:
-            results.append({
-                "index": i,
-                "success": False,
-                "error": "缺少必要参数 text 或 voice_id",
-            })
-            failed += 1
-            continue
-        
-        if reset_context:
-            session.reset_context()
-        
-        emotion_instruction = _build_emotion_instruction(instruction) if instruction else None
-        
-        result = session.synthesize(
-            text=text,
-            voice_type=voice_id,
-            emotion_instruction=emotion_instruction,
-            emotion=emotion,
-            emotion_scale=emotion_scale,
-            output_filename=filename,
-        )
+    def _synthesize_v1(i: int, text: str, voice_id: str, emotion, emotion_scale, filename: str) -> Dict[str, Any]:
+        # 1.0 音色不依赖上下文链，结果只由参数决定，可复用缓存
+        config = TTSConfig(voice_type=voice_id)
+        if emotion:
+            config.emotion = emotion
+            config.emotion_scale = emotion_scale
+        result = tts.synthesize_to_file(text, config, *_split_output_path(os.path.join(out_dir, filename)), auto=True)
         
         if result.success:
-            results.append({
+            return {
                 "index": i,
                 "success": True,
                 "audio_path": result.audio_path,
                 "duration_ms": result.duration_ms,
-            })
-            succeeded += 1
-        else:
-            results.append({
-                "index": i,
-                "success": False,
-                "error": result.error_message or "合成失败",
-            })
-            failed += 1
+                "audio_hash": tts.cache_key(text, config, auto=True),
+                "cached": result.cached,
+            }
+        return {
+            "index": i,
+            "success": False,
+            "error": result.error_message or "合成失败",
+        }
+    
+    results: List[Any] = [None] * len(items)
+    
+    with (
+        MultiTurnTTSSession(tts, output_dir=out_dir) as session,
+        ThreadPoolExecutor(max_workers=max(1, min(BATCH_SYNTHESIS_CONCURRENCY, len(items)))) as executor,
+    ):
+        for i, item in enumerate(items):
+            text = item.get("text", "")
+            voice_id = item.get("voice_id", "")
+            instruction = item.get("instruction", "")
+            emotion = item.get("emotion")
+            emotion_scale = item.get("emotion_scale")
+            filename = item.get("filename", f"dialogue_{i+1:03d}.mp3")
+            reset_context = item.get("reset_context", False)
+            
+            if not text or not voice_id:
+                results[i] = {
+                    "index": i,
+                    "success": False,
+                    "error": "缺少必要参数 text 或 voice_id",
+                }
+                continue
+            
+            if reset_context:
+                session.reset_context()
+            
+            if detect_voice_version(voice_id) == "1.0":
+                results[i] = executor.submit(_synthesize_v1, i, text, voice_id, emotion, emotion_scale, filename)
+                continue
+            
+            # 2.0 音色需要串联 section_id，每次都实际合成；音频还取决于上下文链，
+            # 参数哈希无法标识它，因此不返回 audio_hash
+            emotion_instruction = _build_emotion_instruction(instruction) if instruction else None
+            
+            result = session.synthesize(
+                text=text,
+                voice_type=voice_id,
+                emotion_instruction=emotion_instruction,
+                emotion=emotion,
+                emotion_scale=emotion_scale,
+                output_filename=filename,
+            )
+            
+            if result.success:
+                results[i] = {
+                    "index": i,
+                    "success": True,
+                    "audio_path": result.audio_path,
+                    "duration_ms": result.duration_ms,
+                }
+            else:
+                results[i] = {
+                    "index": i,
+                    "success": False,
+                    "error": result.error_message or "合成失败",
+                }
+        
+        results = [r.result() if isinstance(r, Future) else r for r in results]
+    
+    succeeded = sum(1 for r in results if r["success"])
+    failed = len(results) - succeeded
     
     return {
         "success": failed == 0,
@@ -249,16 +298,13 @@ def _synthesize_batch_multi_turn(items: List[Dict[str, Any]], out_dir: str) -> D
 
 
 def _synthesize_batch_legacy(items: List[Dict[str, Any]], out_dir: str) -> Dict[str, Any]:
-    """原逻辑：独立合成"""
+    """原逻辑：独立合成（各句互不依赖，用有界线程池并发请求）"""
     from backend.services import DoubaoTTSService
     from backend.models import TTSConfig
     
-    results = []
-    succeeded = 0
-    failed = 0
     service_cache = {}
     
-    for i, item in enumerate(items):
+    def _synthesize_one(i: int, item: Dict[str, Any]) -> Dict[str, Any]:
         text = item.get("text", "")
         instruction = item.get("instruction", "")
         voice_id = item.get("voice_id", "")
@@ -266,44 +312,47 @@ def _synthesize_batch_legacy(items: List[Dict[str, Any]], out_dir: str) -> Dict[
         output_path = os.path.join(out_dir, filename)
         
         if not text or not voice_id:
-            results.append({
+            return {
                 "index": i,
                 "success": False,
                 "error": "缺少必要参数 text 或 voice_id",
-            })
-            failed += 1
-            continue
+            }
+        
+        context_texts = _build_context_legacy(instruction)
         
         resource_id = _get_resource_id(voice_id)
-        if resource_id not in service_cache:
-            service_cache[resource_id] = DoubaoTTSService(resource_id=resource_id)
-        service = service_cache[resource_id]
+        service = service_cache.get(resource_id)
+        if service is None:
+            service = service_cache.setdefault(resource_id, DoubaoTTSService(resource_id=resource_id))
         
         config = TTSConfig(voice_type=voice_id)
-        context_texts = _build_context_legacy(instruction)
         
-        result = service.synthesize(
-            text=text,
-            config=config,
-            output_path=output_path,
-            context_texts=context_texts,
+        # 独立合成的结果只由参数决定，可直接复用缓存
+        result = service.synthesize_to_file(
+            text, config, *_split_output_path(output_path), context_texts=context_texts,
         )
         
         if result.success:
-            results.append({
+            return {
                 "index": i,
                 "success": True,
-                "audio_path": result.audio_path or output_path,
+                "audio_path": result.audio_path,
                 "duration_ms": result.duration_ms,
-            })
-            succeeded += 1
-        else:
-            results.append({
-                "index": i,
-                "success": False,
-                "error": result.error_message or "合成失败",
-            })
-            failed += 1
+                "audio_hash": service.cache_key(text, config, context_texts=context_texts),
+                "cached": result.cached,
+            }
+        return {
+            "index": i,
+            "success": False,
+            "error": result.error_message or "合成失败",
+        }
+    
+    # executor.map 保持输入顺序返回结果
+    with ThreadPoolExecutor(max_workers=max(1, min(BATCH_SYNTHESIS_CONCURRENCY, len(items)))) as executor:
+        results = list(executor.map(_synthesize_one, range(len(items)), items))
+    
+    succeeded = sum(1 for r in results if r["success"])
+    failed = len(results) - succeeded
     
     return {
         "success": failed == 0,
@@ -341,6 +390,52 @@ def _build_context_legacy(instruction: str) -> Optional[list]:
     return [result] if result else None
 
 
+def _merge_wav_frames(audio_paths: List[str], output_path: str, gap_ms: int) -> Optional[int]:
+    """
+    直接拼接 PCM 帧合并 WAV（无需解码/重编码），各片段格式不一致时返回 None 交给 pydub 处理
+    
+    Returns:
+        合并后的总时长（毫秒）
+    """
+    import wave
+
+    try:
+        # 先校验全部片段的格式，不一致时直接交给 pydub，不产生任何输出文件
+        params = set()
+        for path in audio_paths:
+            with wave.open(path, "rb") as in_f:
+                params.add((in_f.getnchannels(), in_f.getsampwidth(), in_f.getframerate()))
+    except (wave.Error, EOFError):
+        return None
+    if len(params) != 1:
+        return None
+    nchannels, sampwidth, framerate = params.pop()
+    gap = b"\x00" * (int(framerate * gap_ms / 1000) * nchannels * sampwidth)
+
+    # 写入同目录临时文件，成功后再原子替换，读取中途出错不会留下半截的输出
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".wav.tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, wave.open(raw, "wb") as out_f:
+            out_f.setnchannels(nchannels)
+            out_f.setsampwidth(sampwidth)
+            out_f.setframerate(framerate)
+            for i, path in enumerate(audio_paths):
+                with wave.open(path, "rb") as in_f:
+                    if i > 0 and gap:
+                        out_f.writeframesraw(gap)
+                    out_f.writeframesraw(in_f.readframes(in_f.getnframes()))
+            total_frames = out_f.getnframes()
+        os.replace(tmp_path, output_path)
+    except BaseException as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if isinstance(e, (wave.Error, EOFError)):
+            return None
+        raise
+
+    return int(total_frames * 1000 / framerate)
+
+
 @tool
 def audio_merge(
     audio_paths: List[str],
@@ -427,6 +522,15 @@ def audio_merge(
                 }
             return {"success": False, "error": "合并失败：无法生成输出文件"}
 
+        if suffix == ".wav":
+            merged_duration_ms = _merge_wav_frames(audio_paths, output_path, gap_ms)
+            if merged_duration_ms is not None:
+                return {
+                    "success": True,
+                    "merged_audio_path": output_path,
+                    "total_duration_ms": merged_duration_ms,
+                }
+
         from pydub import AudioSegment
 
         merged = AudioSegment.from_file(audio_paths[0])
@@ -23,8 +23,9 @@
 """
 
 import json
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from functools import cached_property
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass
 from enum import Enum
 
 
@@ -61,6 +62,21 @@ class VoiceInfo:
     category: str               # 细分类别
     emotions: Optional[List[str]] = None  # 支持的情感（仅情感音色）
     capabilities: Optional[List[str]] = None  # 支持能力
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（手写序列化，避免 asdict 的递归深拷贝）"""
+        return {
+            "name": self.name,
+            "voice_type": self.voice_type,
+            "gender": self.gender.value,
+            "language": self.language,
+            "description": self.description,
+            "scenarios": self.scenarios,
+            "version": self.version.value,
+            "category": self.category,
+            "emotions": list(self.emotions) if self.emotions is not None else None,
+            "capabilities": list(self.capabilities) if self.capabilities is not None else None,
+        }
 
 
 # ============================================================================
@@ -280,6 +296,25 @@ class VoiceDatabase:
     
     def __init__(self):
         self.voices = VOICE_DATA
+        
+        # (version, gender) -> 音色下标，保持 VOICE_DATA 中的原始顺序
+        self._by_version_gender: Dict[Tuple[str, VoiceGender], List[int]] = {}
+        # 预渲染的 Markdown 表格行（普通格式 / 多情感格式）
+        self._md_row: List[str] = []
+        self._md_row_emo: List[str] = []
+        
+        for i, v in enumerate(self.voices):
+            self._by_version_gender.setdefault((v.version.value, v.gender), []).append(i)
+            
+            row = f"| {v.name} | {v.voice_type} | {v.description} | {v.scenarios} |"
+            self._md_row.append(row)
+            if v.emotions:
+                emotions_str = "、".join(v.emotions[:5]) + ("..." if len(v.emotions) > 5 else "")
+                self._md_row_emo.append(
+                    f"| {v.name} | {v.voice_type} | {v.description} | {emotions_str} | {v.scenarios} |"
+                )
+            else:
+                self._md_row_emo.append(row)
     
     def get_voices_json(
         self,
@@ -306,12 +341,12 @@ class VoiceDatabase:
                 continue
             if category and voice.category != category:
                 continue
-            result.append(asdict(voice))
+            result.append(voice.to_dict())
         return result
     
     def get_all_voices_json(self) -> List[Dict[str, Any]]:
         """获取所有音色（JSON 格式）"""
-        return [asdict(v) for v in self.voices]
+        return [v.to_dict() for v in self.voices]
     
     def get_voices_by_gender(self, gender: str) -> List[Dict[str, Any]]:
         """按性别获取音色"""
@@ -327,7 +362,7 @@ class VoiceDatabase:
         """根据 voice_type 获取单个音色"""
         for voice in self.voices:
             if voice.voice_type == voice_type:
-                return asdict(voice)
+                return voice.to_dict()
         return None
     
     def search_voices(self, keyword: str) -> List[Dict[str, Any]]:
@@ -338,7 +373,7 @@ class VoiceDatabase:
             if (keyword in voice.name.lower() or
                 keyword in voice.description.lower() or
                 keyword in voice.scenarios.lower()):
-                result.append(asdict(voice))
+                result.append(voice.to_dict())
         return result
     
     def get_voices_markdown(self) -> str:
@@ -348,6 +383,11 @@ class VoiceDatabase:
         Returns:
             适用于 LLM 的 Markdown 格式文本
         """
+        return self._voices_markdown
+    
+    @cached_property
+    def _voices_markdown(self) -> str:
+        """构建 Markdown 文本（表格行已在初始化时预渲染，这里只做拼接）"""
         lines = [
             "# 豆包TTS音色数据库",
             "",
@@ -361,14 +401,6 @@ class VoiceDatabase:
             "",
         ]
         
-        # 按版本分组
-        version_groups = {}
-        for voice in self.voices:
-            key = voice.version.value
-            if key not in version_groups:
-                version_groups[key] = []
-            version_groups[key].append(voice)
-        
         version_titles = {
             "2.0": "一、通用高质量音色（2.0版本，推荐优先使用）",
             "1.0_emo": "二、多情感音色（1.0版本，支持情感控制）",
@@ -377,41 +409,36 @@ class VoiceDatabase:
             "english": "五、英文音色",
         }
         
+        present_versions = {version_key for version_key, _ in self._by_version_gender}
+        
         for version_key, title in version_titles.items():
-            if version_key not in version_groups:
+            if version_key not in present_versions:
                 continue
             
             lines.append(f"## {title}")
             lines.append("")
             
-            voices = version_groups[version_key]
+            is_emo = version_key == "1.0_emo"
+            rows = self._md_row_emo if is_emo else self._md_row
             
             # 按性别分组
-            female_voices = [v for v in voices if v.gender == VoiceGender.FEMALE]
-            male_voices = [v for v in voices if v.gender == VoiceGender.MALE]
-            
-            for gender_name, gender_voices in [("女声", female_voices), ("男声", male_voices)]:
-                if not gender_voices:
+            for gender_name, gender in (("女声", VoiceGender.FEMALE), ("男声", VoiceGender.MALE)):
+                indices = self._by_version_gender.get((version_key, gender))
+                if not indices:
                     continue
                 
                 lines.append(f"### {gender_name}")
                 lines.append("")
                 
                 # 表头
-                if version_key == "1.0_emo":
+                if is_emo:
                     lines.append("| 展示名称 | voice_type | 特点描述 | 支持情感 | 适用场景 |")
                     lines.append("|---------|-----------|---------|---------|---------|")
                 else:
                     lines.append("| 展示名称 | voice_type | 特点描述 | 适用场景 |")
                     lines.append("|---------|-----------|---------|---------|")
                 
-                for v in gender_voices:
-                    if version_key == "1.0_emo" and v.emotions:
-                        emotions_str = "、".join(v.emotions[:5]) + ("..." if len(v.emotions) > 5 else "")
-                        lines.append(f"| {v.name} | {v.voice_type} | {v.description} | {emotions_str} | {v.scenarios} |")
-                    else:
-                        lines.append(f"| {v.name} | {v.voice_type} | {v.description} | {v.scenarios} |")
-                
+                lines.append("\n".join(rows[i] for i in indices))
                 lines.append("")
             
             lines.append("---")
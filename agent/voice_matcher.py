@@ -6,13 +6,14 @@
 """
 
 import os
-import re
 import json
 import uuid
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Callable
 
+import orjson
+
 os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
 os.environ.setdefault("LANGSMITH_TRACING", "false")
 
@@ -23,12 +24,87 @@ from .prompts import VOICE_MATCHER_SYSTEM_PROMPT
 from .models import VoiceMapping
 from .templates import ALL_VOICES, format_all_voices_brief
 from .tools import tts_preview
+from .llm_stream import collect_llm_stream
 
 logger = logging.getLogger(__name__)
 
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def _raw_decode_at(text: str, idx: int) -> Optional[tuple]:
+    """从 idx 处解码一个完整 JSON 值，返回 (值, 结束位置)，失败返回 None"""
+    try:
+        return _DECODER.raw_decode(text, idx)
+    except json.JSONDecodeError:
+        return None
+
+
+def _next_json_start(text: str, pos: int) -> int:
+    """查找 pos 之后第一个 '{' 或 '['"""
+    brace = text.find('{', pos)
+    bracket = text.find('[', pos)
+    if brace == -1:
+        return bracket
+    if bracket == -1:
+        return brace
+    return min(brace, bracket)
+
+
+class _StreamingJsonScanner:
+    """
+    增量扫描流式文本中的顶层 JSON 对象
+    
+    逐分片维护括号深度和字符串状态，对象闭合且包含 required_key 时立即解码，
+    解析与后续网络传输重叠，无需等到整个响应结束。
+    """
+    
+    def __init__(self, required_key: str):
+        self._required_key = required_key
+        self._parts: List[str] = []
+        self._offset = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: Optional[Dict[str, Any]] = None
+    
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """送入一个分片，根对象解析完成时返回该对象"""
+        if self.result is not None:
+            return self.result
+        
+        base = self._offset
+        self._parts.append(chunk)
+        self._offset += len(chunk)
+        
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                # 对象外的引号属于说明文字，不计入字符串状态
+                self._in_string = self._depth > 0
+            elif ch == '{':
+                if self._depth == 0:
+                    self._start = base + i
+                self._depth += 1
+            elif ch == '}' and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    decoded = _raw_decode_at("".join(self._parts), self._start)
+                    if decoded and isinstance(decoded[0], dict) and self._required_key in decoded[0]:
+                        self.result = decoded[0]
+                        return self.result
+        return None
+
 
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
-    """从文本中提取 JSON 对象"""
+    """从文本中提取 JSON 对象（线性扫描，不使用正则）"""
     if not text:
         return None
     
@@ -37,33 +113,82 @@ def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     except json.JSONDecodeError:
         pass
     
-    code_block_pattern = r'```(?:json)?\s*\n?([\s\S]*?)\n?```'
-    matches = re.findall(code_block_pattern, text)
-    for match in matches:
-        try:
-            return json.loads(match.strip())
-        except json.JSONDecodeError:
-            continue
-    
-    start = text.find('{')
-    end = text.rfind('}')
-    if start != -1 and end != -1 and end > start:
-        try:
-            return json.loads(text[start:end + 1])
-        except json.JSONDecodeError:
-            pass
+    # 代码块：```json ... ```
+    pos = 0
+    while True:
+        fence = text.find('```', pos)
+        if fence == -1:
+            break
+        close = text.find('```', fence + 3)
+        if close == -1:
+            break
+        
+        body = fence + 3
+        if text.startswith('json', body):
+            body += 4
+        while body < close and text[body] in _WHITESPACE:
+            body += 1
+        
+        decoded = _raw_decode_at(text, body)
+        if decoded and decoded[1] <= close:
+            return decoded[0]
+        pos = close + 3
     
-    start = text.find('[')
-    end = text.rfind(']')
-    if start != -1 and end != -1 and end > start:
-        try:
-            return {"voice_mapping": json.loads(text[start:end + 1])}
-        except json.JSONDecodeError:
-            pass
+    # 裸 JSON：从第一个 '{' / '[' 开始逐个尝试，只接受音色映射形状的值，
+    # 避免说明文字里的 "[1]" 或截断响应中的内层对象被误当作结果
+    pos = _next_json_start(text, 0)
+    while pos != -1:
+        decoded = _raw_decode_at(text, pos)
+        if decoded:
+            value = decoded[0]
+            if isinstance(value, dict) and "voice_mapping" in value:
+                return value
+            if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+                return {"voice_mapping": value}
+        pos = _next_json_start(text, pos + 1)
     
     return None
 
 
+def _unique_characters(dialogue_list: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """按首次出现顺序提取唯一角色及其首句台词"""
+    first_items: Dict[str, Dict[str, Any]] = {}
+    for item in dialogue_list:
+        char = item.get("character")
+        if char:
+            first_items.setdefault(char, item)
+    return {
+        char: {
+            "character": char,
+            "character_desc": item.get("character_desc", ""),
+            "first_line": item.get("text", "")[:50],
+        }
+        for char, item in first_items.items()
+    }
+
+
+def _resolve_batch_ids(
+    voice_mapping: List[Any],
+    id_to_character: Dict[int, str],
+) -> List[Dict[str, Any]]:
+    """将按编号返回的映射条目还原为角色名（编号优先于模型回填的角色名）"""
+    resolved = []
+    for mapping in voice_mapping:
+        if not isinstance(mapping, dict):
+            continue
+        mapping = dict(mapping)
+        raw_id = mapping.pop("id", None)
+        try:
+            char = id_to_character.get(int(raw_id))
+        except (TypeError, ValueError):
+            char = None
+        if char:
+            mapping["character"] = char
+        if mapping.get("character"):
+            resolved.append(mapping)
+    return resolved
+
+
 @tool
 def save_voice_mapping(voice_mapping_json: str) -> str:
     """
@@ -83,10 +208,10 @@ def save_voice_mapping(voice_mapping_json: str) -> str:
         elif isinstance(data, list):
             voice_mapping = data
         else:
-            return json.dumps({
+            return orjson.dumps({
                 "success": False,
                 "error": "格式不正确，请确保包含 voice_mapping 字段",
-            }, ensure_ascii=False)
+            }).decode()
         
         valid_mappings = []
         for mapping in voice_mapping:
@@ -94,23 +219,23 @@ def save_voice_mapping(voice_mapping_json: str) -> str:
                 valid_mappings.append(mapping)
         
         if valid_mappings:
-            return json.dumps({
+            return orjson.dumps({
                 "success": True,
                 "message": f"✅ 已保存 {len(valid_mappings)} 个音色映射",
                 "count": len(valid_mappings),
                 "data": {"voice_mapping": valid_mappings},
-            }, ensure_ascii=False)
+            }).decode()
         else:
-            return json.dumps({
+            return orjson.dumps({
                 "success": False,
                 "error": "音色映射中没有有效的条目",
-            }, ensure_ascii=False)
+            }).decode()
             
     except json.JSONDecodeError as e:
-        return json.dumps({
+        return orjson.dumps({
             "success": False,
             "error": f"JSON 解析失败: {e}",
-        }, ensure_ascii=False)
+        }).decode()
 
 
 VOICE_MATCHER_TOOLS = [save_voice_mapping, tts_preview]
@@ -144,6 +269,13 @@ class VoiceMatcherAgent:
         )
         self.llm = streaming_config.create_llm()
         
+        # 系统提示词只依赖静态音色数据，构建一次后复用，保证每次调用前缀一致
+        self._system_prompt = (
+            VOICE_MATCHER_SYSTEM_PROMPT
+            + "\n\n## 可用音色列表\n\n"
+            + format_all_voices_brief()
+        )
+        
         if checkpointer is None:
             checkpointer = InMemorySaver()
         self.checkpointer = checkpointer
@@ -159,10 +291,7 @@ class VoiceMatcherAgent:
             print(message)
     
     def _build_system_prompt(self) -> str:
-        prompt = VOICE_MATCHER_SYSTEM_PROMPT
-        prompt += "\n\n## 可用音色列表\n\n"
-        prompt += format_all_voices_brief()
-        return prompt
+        return self._system_prompt
     
     def _create_agent(self):
         try:
@@ -185,22 +314,21 @@ class VoiceMatcherAgent:
         self._log(f"🗑️ 已开启新对话! ID: {self._thread_id}")
         return self._thread_id
     
-    def _stream_direct(self, prompt: str, system_prompt: Optional[str] = None):
-        """直接调用 LLM 流式输出"""
-        from langchain_core.messages import HumanMessage, SystemMessage
-        
-        messages = []
-        
-        if system_prompt:
-            messages.append(SystemMessage(content=system_prompt))
-        else:
-            messages.append(SystemMessage(content=self._build_system_prompt()))
-        
-        messages.append(HumanMessage(content=prompt))
+    async def _collect_stream(
+        self,
+        prompt: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        scanner: Optional[_StreamingJsonScanner] = None,
+    ) -> str:
+        """
+        消费 LLM 异步流式输出并拼接，分片到达时实时回调 on_chunk
         
-        for chunk in self.llm.stream(messages):
-            if hasattr(chunk, 'content') and chunk.content:
-                yield chunk.content
+        传入 scanner 时边接收边解析，根对象一旦完整即停止读取剩余输出。
+        """
+        stop = (lambda chunk: scanner.feed(chunk) is not None) if scanner else None
+        return await collect_llm_stream(
+            self.llm, self._build_system_prompt(), prompt, on_chunk=on_chunk, stop=stop,
+        )
     
     async def match(
         self,
@@ -220,31 +348,28 @@ class VoiceMatcherAgent:
             音色映射结果
         """
         # 提取唯一角色
-        characters = {}
-        for item in dialogue_list:
-            char = item.get("character", "")
-            if char and char not in characters:
-                characters[char] = {
-                    "character": char,
-                    "character_desc": item.get("character_desc", ""),
-                    "first_line": item.get("text", "")[:50],
-                }
+        characters = _unique_characters(dialogue_list)
+        
+        # 按编号批量提交，模型只需回填编号，无需重复输出角色名
+        id_to_character = {i: char for i, char in enumerate(characters, 1)}
+        character_lines = "\n".join(
+            f"[{i}] 角色={c['character']} | 描述={c['character_desc'] or '无'} | 首句={c['first_line']}"
+            for i, c in enumerate(characters.values(), 1)
+        )
         
         prompt = f"""请为以下角色匹配最佳音色。
 
-## 角色列表
-```json
-{json.dumps(list(characters.values()), ensure_ascii=False, indent=2)}
-```
+## 角色列表（[编号] 角色信息）
+{character_lines}
 
 ## 输出要求
-请根据角色描述和首句台词，为每个角色匹配最合适的音色。直接输出以下 JSON 格式：
+请根据角色描述和首句台词，为每个编号的角色各匹配一个最合适的音色。直接输出以下 JSON 格式：
 
 ```json
 {{
   "voice_mapping": [
     {{
-      "character": "角色名",
+      "id": 1,
       "voice_id": "音色ID",
       "voice_name": "音色名称",
       "reason": "匹配理由"
@@ -257,27 +382,28 @@ class VoiceMatcherAgent:
         
         self.new_session()
         
-        response_parts: List[str] = []
-        for chunk in self._stream_direct(prompt):
-            response_parts.append(chunk)
-            if on_chunk:
-                on_chunk(chunk)
-        
-        response_text = "".join(response_parts)
-        return self._parse_json_result(response_text, characters)
+        scanner = _StreamingJsonScanner("voice_mapping")
+        response_text = await self._collect_stream(prompt, on_chunk, scanner)
+        return self._parse_json_result(
+            response_text, characters, id_to_character, extracted=scanner.result,
+        )
     
     def _parse_json_result(
         self,
         response_text: str,
         characters: Dict[str, Dict[str, Any]],
+        id_to_character: Optional[Dict[int, str]] = None,
+        extracted: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        """从 LLM 响应中解析 JSON 结果"""
-        extracted = extract_json_from_text(response_text)
+        """从 LLM 响应中解析 JSON 结果（extracted 为流式阶段已解析出的对象）"""
+        if extracted is None:
+            extracted = extract_json_from_text(response_text)
         
         if extracted:
             voice_mapping = extracted.get("voice_mapping", [])
             if isinstance(extracted, list):
                 voice_mapping = extracted
+            voice_mapping = _resolve_batch_ids(voice_mapping, id_to_character or {})
             
             # 补充试听文本
             for mapping in voice_mapping:
@@ -309,35 +435,67 @@ class VoiceMatcherAgent:
         output_dir: str = None,
     ) -> Dict[str, Any]:
         """对话式重新匹配"""
-        chars_info = ""
-        if target_characters:
-            chars_info = f"请重点关注角色: {', '.join(target_characters)}"
+        id_to_character = {
+            i: mapping.get("character", "") for i, mapping in enumerate(voice_mapping, 1)
+        }
+        mapping_lines = "\n".join(
+            f"[{i}] 角色={m.get('character', '')} | 音色={m.get('voice_name', '')}({m.get('voice_id', '')}) | 理由={m.get('reason', '')}"
+            for i, m in enumerate(voice_mapping, 1)
+        )
+        
+        # 指定了目标角色时只让模型输出这些编号，其余角色保持不变
+        targets = set(target_characters or [])
+        target_ids = [i for i, char in id_to_character.items() if char in targets]
+        if target_ids:
+            scope = f"只需输出编号 {', '.join(map(str, target_ids))} 的角色，其余角色保持不变。"
+        elif target_characters:
+            scope = f"请重点关注角色: {', '.join(target_characters)}，输出所有编号角色的音色映射。"
+        else:
+            scope = "输出所有编号角色的音色映射。"
         
         prompt = f"""请根据以下指令重新匹配音色：
 
-## 当前音色映射
-```json
-{json.dumps(voice_mapping, ensure_ascii=False, indent=2)}
-```
+## 当前音色映射（[编号] 映射信息）
+{mapping_lines}
 
 ## 修改指令
 {instruction}
 
-{chars_info}
+## 输出要求
+{scope}直接输出以下 JSON 格式：
 
-修改完成后，输出完整的 JSON 音色映射。"""
-        
-        response_parts: List[str] = []
-        for chunk in self._stream_direct(prompt):
-            response_parts.append(chunk)
+```json
+{{
+  "voice_mapping": [
+    {{
+      "id": 1,
+      "voice_id": "音色ID",
+      "voice_name": "音色名称",
+      "reason": "匹配理由"
+    }}
+  ]
+}}
+```"""
         
-        response_text = "".join(response_parts)
+        response_text = await self._collect_stream(prompt)
         extracted = extract_json_from_text(response_text)
         
         if extracted:
-            new_mapping = extracted.get("voice_mapping", [])
+            updates = extracted.get("voice_mapping", [])
             if isinstance(extracted, list):
-                new_mapping = extracted
+                updates = extracted
+            updates_by_char = {
+                u["character"]: u for u in _resolve_batch_ids(updates, id_to_character)
+            }
+            
+            new_mapping = []
+            for mapping in voice_mapping:
+                update = updates_by_char.pop(mapping.get("character", ""), None)
+                merged = {**mapping, **update} if update else dict(mapping)
+                if update and update.get("voice_id") != mapping.get("voice_id"):
+                    merged["preview_audio"] = ""
+                new_mapping.append(merged)
+            new_mapping.extend(updates_by_char.values())
             
             self._last_result = {
                 "success": True,
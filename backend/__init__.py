@@ -3,6 +3,8 @@
 TTS Agent 后端服务
 
 提供 FastAPI 服务和 TTS 服务
+
+推荐运行时：uvicorn + uvloop + httptools（见 SERVER_LOOP / SERVER_HTTP，可用环境变量覆盖）
 """
 
 from .config import (
@@ -15,6 +17,8 @@ from .config import (
     LLM_MODEL,
     SERVER_HOST,
     SERVER_PORT,
+    SERVER_LOOP,
+    SERVER_HTTP,
     DATABASE_PATH,
     DATA_DIR,
 )
@@ -29,6 +33,8 @@ __all__ = [
     "LLM_MODEL",
     "SERVER_HOST",
     "SERVER_PORT",
+    "SERVER_LOOP",
+    "SERVER_HTTP",
     "DATABASE_PATH",
     "DATA_DIR",
 ]
@@ -7,120 +7,237 @@ TTS Agent API 路由
 
 import os
 import uuid
-import json
 import asyncio
 import logging
-import re
 import hashlib
-from pathlib import Path
-from typing import Optional, List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
-
-from fastapi import APIRouter, HTTPException, Query, Response, Body
-from fastapi.responses import StreamingResponse, FileResponse
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable, Callable
+
+import anyio
+import orjson
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response, Body
+from fastapi.responses import StreamingResponse, FileResponse, ORJSONResponse
 from pydantic import BaseModel, Field
 
 from backend.models import SessionStatus, init_database
+from backend.services import (
+    get_tos_settings, is_tos_upload_enabled, presign_tos_object, upload_session_audio,
+)
 from agent import (
     TTSPipelineController,
     create_tts_pipeline,
+    session_output_dir,
+    MERGED_AUDIO_FILENAME,
     TTSSessionService,
     format_all_voices_brief,
-    get_voice_by_id,
-    get_voices_by_category,
     ALL_VOICES,
 )
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# 返回普通 dict 时 FastAPI 仍会先经过 jsonable_encoder；大响应直接返回 ORJSONResponse 跳过该步骤
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# 试听合成并发上限（TTS 为 I/O 密集型，独立限流，不占用其他接口的线程）
+_tts_limiter = anyio.CapacityLimiter(int(os.getenv("TTS_CONCURRENCY", "16")))
+
+
+class _PipelineCache:
+    """
+    pipeline 的 LRU + TTL 缓存
+    
+    会话状态在每个阶段都已落库，被淘汰的 pipeline 下次访问时会从数据库重新加载，
+    因此淘汰只需丢弃引用即可释放其持有的 LLM 客户端等资源。
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, session_id: str) -> Optional[TTSPipelineController]:
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            pipeline, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[session_id]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._data[session_id] = (pipeline, time.monotonic() + self.ttl)
+            self._data.move_to_end(session_id)
+            self.hits += 1
+            return pipeline
+    
+    def set(self, session_id: str, pipeline: TTSPipelineController):
+        with self._lock:
+            self._data[session_id] = (pipeline, time.monotonic() + self.ttl)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def pop(self, session_id: str):
+        with self._lock:
+            self._data.pop(session_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
 
-# 线程池，用于运行同步的 LLM 调用
-_executor = ThreadPoolExecutor(max_workers=4)
 
 # 全局 pipeline 缓存
-_pipeline_cache: Dict[str, TTSPipelineController] = {}
+_pipeline_cache = _PipelineCache(
+    maxsize=int(os.getenv("PIPELINE_CACHE_MAX", "256")),
+    ttl=float(os.getenv("PIPELINE_CACHE_TTL", "3600")),
+)
 
-def _sanitize_object_name(name: str) -> str:
-    cleaned = re.sub(r"[^0-9A-Za-z._-]+", "_", name.strip())
-    cleaned = cleaned.strip("._-")
-    return cleaned or "file"
+# 音色索引（导入时构建一次，筛选变为字典查找）
+_VOICE_INDEX: Dict[str, Dict[str, Any]] = {}
+_VOICES_BY_CATEGORY: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+_VOICES_BY_GENDER: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+_VOICES_BY_CG: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
 
+for _voice in ALL_VOICES:
+    _VOICE_INDEX.setdefault(_voice["voice_id"], _voice)
+    _VOICES_BY_CATEGORY[_voice.get("category")].append(_voice)
+    _VOICES_BY_GENDER[_voice.get("gender")].append(_voice)
+    _VOICES_BY_CG[(_voice.get("category"), _voice.get("gender"))].append(_voice)
+del _voice
 
-def _get_tos_client():
-    try:
-        import tos
-    except Exception:
-        return None
+def _get_or_create_pipeline(session_id: Optional[str] = None) -> TTSPipelineController:
+    """获取或创建 pipeline"""
+    if session_id:
+        pipeline = _pipeline_cache.get(session_id)
+        if pipeline is not None:
+            return pipeline
+    
+    pipeline = create_tts_pipeline(session_id=session_id, persist=True)
+    _pipeline_cache.set(pipeline.session_id, pipeline)
+    return pipeline
 
-    ak = os.getenv("TOS_ACCESS_KEY") or os.getenv("VOLCENGINE_ACCESS_KEY") or ""
-    sk = os.getenv("TOS_SECRET_KEY") or os.getenv("VOLCENGINE_SECRET_KEY") or ""
-    endpoint = os.getenv("TOS_ENDPOINT") or ""
-    region = os.getenv("TOS_REGION") or ""
 
-    if not (ak and sk and endpoint and region):
-        return None
+# 会话级锁：同一会话的阶段调用串行执行，避免并发请求交错修改 pipeline 状态。
+# 查找/创建 pipeline 本身是同步调用，在事件循环内天然原子，无需加锁。
+# 弱引用字典：没有请求持有时锁自动回收，不随会话数增长。
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
-    return tos.TosClientV2(ak, sk, endpoint, region)
 
+def _lock_for(session_id: str) -> asyncio.Lock:
+    """获取会话锁"""
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[session_id] = lock
+    return lock
 
-def _upload_file_to_tos(
-    local_path: str,
-    session_id: str,
-    content_type: Optional[str] = None,
-) -> Optional[dict]:
-    client = _get_tos_client()
-    if client is None:
-        return None
-
-    bucket = os.getenv("TOS_BUCKET") or ""
-    if not bucket:
-        return None
-
-    prefix = (os.getenv("TOS_PREFIX") or "tts-agent-output").strip("/")
-    expires = int(os.getenv("TOS_URL_EXPIRES", "3600"))
-
-    p = Path(local_path)
-    if not p.exists() or not p.is_file():
-        return None
-
-    filename = _sanitize_object_name(p.name)
-    object_key = f"{prefix}/{session_id}/{filename}"
-
-    inferred_ct = content_type
-    if not inferred_ct:
-        ext = p.suffix.lower()
-        if ext == ".mp3":
-            inferred_ct = "audio/mpeg"
-        elif ext == ".wav":
-            inferred_ct = "audio/wav"
-        elif ext == ".ogg":
-            inferred_ct = "audio/ogg"
-        elif ext == ".pcm":
-            inferred_ct = "application/octet-stream"
-
-    client.put_object_from_file(
-        bucket=bucket,
-        key=object_key,
-        file_path=str(p),
-        content_type=inferred_ct,
-    )
-    url = client.generate_presigned_url("GET", Bucket=bucket, Key=object_key, ExpiresIn=expires)
-    return {"bucket": bucket, "key": object_key, "url": url}
 
+# SSE 分片合并窗口（秒）：窗口内到达的 LLM 分片合并为一帧发送
+_SSE_BATCH_INTERVAL = 0.05
+_SSE_DONE = object()
 
-def _is_tos_upload_enabled() -> bool:
-    return (os.getenv("TOS_UPLOAD_ENABLED") or "").strip().lower() in {"1", "true", "yes", "on"}
+# 长时间无输出时发送注释帧保活，避免代理因空闲断开连接
+_SSE_KEEPALIVE_INTERVAL = 15.0
+_SSE_KEEPALIVE = b": keepalive\n\n"
 
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
 
-def _get_or_create_pipeline(session_id: Optional[str] = None) -> TTSPipelineController:
-    """获取或创建 pipeline"""
-    if session_id and session_id in _pipeline_cache:
-        return _pipeline_cache[session_id]
+
+# chunk 帧的固定外壳预先编码，每帧只需序列化内容字符串
+_SSE_CHUNK_PREFIX = b'data: {"type":"chunk","content":'
+_SSE_CHUNK_SUFFIX = b"}\n\n"
+
+
+def _sse_event(payload: Dict[str, Any]) -> bytes:
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def _sse_chunk(content: str) -> bytes:
+    return _SSE_CHUNK_PREFIX + orjson.dumps(content) + _SSE_CHUNK_SUFFIX
+
+
+async def _stream_stage_events(
+    session_id: str,
+    run_stage: Callable[[Callable[[Any], None]], Awaitable[Dict[str, Any]]],
+) -> AsyncIterator[bytes]:
+    """
+    运行流水线阶段并以 SSE 实时推送输出，分片按时间窗口合并后发送
     
-    pipeline = create_tts_pipeline(session_id=session_id, persist=True)
-    _pipeline_cache[pipeline.session_id] = pipeline
-    return pipeline
+    run_stage 收到的回调接受文本分片或 dict 事件；事件不参与合并，按到达顺序单独发送。
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    lock = _lock_for(session_id)
+
+    async def run() -> Dict[str, Any]:
+        try:
+            # LLM 以 astream 在事件循环内推送分片，可直接入队
+            async with lock:
+                return await run_stage(queue.put_nowait)
+        finally:
+            queue.put_nowait(_SSE_DONE)
+
+    task = asyncio.create_task(run())
+
+    done = False
+    while not done:
+        try:
+            item = await asyncio.wait_for(queue.get(), _SSE_KEEPALIVE_INTERVAL)
+        except asyncio.TimeoutError:
+            yield _SSE_KEEPALIVE
+            continue
+        if item is _SSE_DONE:
+            break
+        if isinstance(item, dict):
+            yield _sse_event(item)
+            continue
+
+        await asyncio.sleep(_SSE_BATCH_INTERVAL)
+        parts = [item]
+        event = None
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is _SSE_DONE:
+                done = True
+                break
+            if isinstance(item, dict):
+                event = item
+                break
+            parts.append(item)
+
+        yield _sse_chunk("".join(parts))
+        if event is not None:
+            yield _sse_event(event)
+
+    try:
+        result = await task
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    yield _sse_event({"type": "result", "data": result})
 
 
 # ============================================================================
@@ -162,16 +279,33 @@ class RematchRequest(BaseModel):
     target_characters: Optional[List[str]] = None
 
 
+class UploadUrlsRequest(BaseModel):
+    """直传预签名 URL 请求"""
+    filenames: List[str]
+
+
+class PreviewItem(BaseModel):
+    """单条试听项"""
+    voice_id: str
+    text: str = "你好，这是一段试听文本。"
+
+
+class BatchPreviewRequest(BaseModel):
+    """批量试听请求"""
+    items: List[PreviewItem]
+    session_id: Optional[str] = None
+
+
 # ============================================================================
 #                              会话管理 API
 # ============================================================================
 
 @router.post("/sessions")
-async def create_session(request: CreateSessionRequest = Body(default=CreateSessionRequest())):
+async def create_session(request: Optional[CreateSessionRequest] = Body(default=None)):
     """创建新的 TTS 会话"""
     try:
         pipeline = create_tts_pipeline(persist=True)
-        _pipeline_cache[pipeline.session_id] = pipeline
+        _pipeline_cache.set(pipeline.session_id, pipeline)
         
         return {
             "success": True,
@@ -192,7 +326,7 @@ async def list_sessions(
     try:
         service = TTSSessionService()
         sessions = service.list_sessions(status=status, limit=limit)
-        return {"success": True, "sessions": sessions}
+        return ORJSONResponse({"success": True, "sessions": sessions})
     except Exception as e:
         logger.exception("列出会话失败")
         raise HTTPException(status_code=500, detail=str(e))
@@ -202,8 +336,18 @@ async def list_sessions(
 async def get_session(session_id: str):
     """获取会话详情"""
     try:
-        pipeline = _get_or_create_pipeline(session_id)
-        return {"success": True, "data": pipeline.to_dict()}
+        # 已缓存的 pipeline 直接导出；否则只读查询数据库，不为状态轮询构建 pipeline
+        pipeline = _pipeline_cache.get(session_id)
+        if pipeline is not None:
+            return ORJSONResponse({"success": True, "data": pipeline.to_dict()})
+        
+        data = TTSSessionService().get_session_dict(session_id)
+        if data is None:
+            raise HTTPException(status_code=404, detail="会话不存在")
+        data["output_dir"] = session_output_dir(session_id)
+        return ORJSONResponse({"success": True, "data": data})
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"获取会话失败: {session_id}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -216,8 +360,7 @@ async def delete_session(session_id: str):
         service = TTSSessionService()
         success = service.delete_session(session_id)
         
-        if session_id in _pipeline_cache:
-            del _pipeline_cache[session_id]
+        _pipeline_cache.pop(session_id)
         
         return {"success": success}
     except Exception as e:
@@ -235,11 +378,8 @@ async def analyze_dialogue(session_id: str, request: AnalyzeRequest):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            _executor,
-            lambda: asyncio.run(pipeline.stage1_analyze(request.user_input))
-        )
+        async with _lock_for(session_id):
+            result = await pipeline.stage1_analyze(request.user_input)
         
         return result
     except Exception as e:
@@ -253,58 +393,13 @@ async def analyze_dialogue_stream(session_id: str, request: AnalyzeRequest):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        async def generate():
-            loop = asyncio.get_running_loop()
-            queue: asyncio.Queue[str] = asyncio.Queue()
-
-            def on_chunk(chunk: str):
-                loop.call_soon_threadsafe(queue.put_nowait, chunk)
-
-            def run_pipeline():
-                return asyncio.run(
-                    pipeline.stage1_analyze(request.user_input, on_chunk=on_chunk)
-                )
-
-            result_future = loop.run_in_executor(_executor, run_pipeline)
-            chunk_task = asyncio.create_task(queue.get())
-
-            try:
-                while True:
-                    done, _pending = await asyncio.wait(
-                        {result_future, chunk_task},
-                        return_when=asyncio.FIRST_COMPLETED,
-                    )
-
-                    if chunk_task in done:
-                        chunk = chunk_task.result()
-                        yield f"data: {json.dumps({'type': 'chunk', 'content': chunk}, ensure_ascii=False)}\n\n"
-                        chunk_task = asyncio.create_task(queue.get())
-
-                    if result_future in done:
-                        try:
-                            result = result_future.result()
-                        except Exception as e:
-                            payload = {"success": False, "error": str(e)}
-                            yield f"data: {json.dumps({'type': 'result', 'data': payload}, ensure_ascii=False)}\n\n"
-                            return
-
-                        while not queue.empty():
-                            chunk = queue.get_nowait()
-                            yield f"data: {json.dumps({'type': 'chunk', 'content': chunk}, ensure_ascii=False)}\n\n"
-
-                        yield f"data: {json.dumps({'type': 'result', 'data': result}, ensure_ascii=False)}\n\n"
-                        return
-            finally:
-                chunk_task.cancel()
-        
         return StreamingResponse(
-            generate(),
+            _stream_stage_events(
+                session_id,
+                lambda on_chunk: pipeline.stage1_analyze(request.user_input, on_chunk=on_chunk),
+            ),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            }
+            headers=_SSE_HEADERS,
         )
     except Exception as e:
         logger.exception(f"流式分析失败: {session_id}")
@@ -317,13 +412,8 @@ async def refine_dialogue(session_id: str, request: RefineRequest):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            _executor,
-            lambda: asyncio.run(
-                pipeline.stage1_refine(request.instruction, request.target_indices)
-            )
-        )
+        async with _lock_for(session_id):
+            result = await pipeline.stage1_refine(request.instruction, request.target_indices)
         
         return result
     except Exception as e:
@@ -336,7 +426,8 @@ async def update_dialogues(session_id: str, request: UpdateDialogueRequest):
     """阶段一：手动更新对话列表"""
     try:
         pipeline = _get_or_create_pipeline(session_id)
-        result = pipeline.stage1_update(request.dialogue_list)
+        async with _lock_for(session_id):
+            result = pipeline.stage1_update(request.dialogue_list)
         return result
     except Exception as e:
         logger.exception(f"更新失败: {session_id}")
@@ -349,10 +440,11 @@ async def confirm_stage1(session_id: str):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        if not pipeline.dialogue_list:
-            return {"success": False, "error": "对话列表为空"}
-        
-        pipeline._update_status(SessionStatus.DIALOGUE_READY)
+        async with _lock_for(session_id):
+            if not pipeline.dialogue_list:
+                return {"success": False, "error": "对话列表为空"}
+            
+            pipeline._update_status(SessionStatus.DIALOGUE_READY)
         
         return {
             "success": True,
@@ -374,11 +466,8 @@ async def match_voices(session_id: str):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            _executor,
-            lambda: asyncio.run(pipeline.stage2_match())
-        )
+        async with _lock_for(session_id):
+            result = await pipeline.stage2_match()
         
         return result
     except Exception as e:
@@ -392,56 +481,10 @@ async def match_voices_stream(session_id: str):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        async def generate():
-            loop = asyncio.get_running_loop()
-            queue: asyncio.Queue[str] = asyncio.Queue()
-
-            def on_chunk(chunk: str):
-                loop.call_soon_threadsafe(queue.put_nowait, chunk)
-
-            def run_pipeline():
-                return asyncio.run(pipeline.stage2_match(on_chunk=on_chunk))
-
-            result_future = loop.run_in_executor(_executor, run_pipeline)
-            chunk_task = asyncio.create_task(queue.get())
-
-            try:
-                while True:
-                    done, _pending = await asyncio.wait(
-                        {result_future, chunk_task},
-                        return_when=asyncio.FIRST_COMPLETED,
-                    )
-
-                    if chunk_task in done:
-                        chunk = chunk_task.result()
-                        yield f"data: {json.dumps({'type': 'chunk', 'content': chunk}, ensure_ascii=False)}\n\n"
-                        chunk_task = asyncio.create_task(queue.get())
-
-                    if result_future in done:
-                        try:
-                            result = result_future.result()
-                        except Exception as e:
-                            payload = {"success": False, "error": str(e)}
-                            yield f"data: {json.dumps({'type': 'result', 'data': payload}, ensure_ascii=False)}\n\n"
-                            return
-
-                        while not queue.empty():
-                            chunk = queue.get_nowait()
-                            yield f"data: {json.dumps({'type': 'chunk', 'content': chunk}, ensure_ascii=False)}\n\n"
-
-                        yield f"data: {json.dumps({'type': 'result', 'data': result}, ensure_ascii=False)}\n\n"
-                        return
-            finally:
-                chunk_task.cancel()
-        
         return StreamingResponse(
-            generate(),
+            _stream_stage_events(session_id, lambda on_chunk: pipeline.stage2_match(on_chunk=on_chunk)),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-            }
+            headers=_SSE_HEADERS,
         )
     except Exception as e:
         logger.exception(f"流式匹配失败: {session_id}")
@@ -454,13 +497,8 @@ async def rematch_voices(session_id: str, request: RematchRequest):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            _executor,
-            lambda: asyncio.run(
-                pipeline.stage2_rematch(request.instruction, request.target_characters)
-            )
-        )
+        async with _lock_for(session_id):
+            result = await pipeline.stage2_rematch(request.instruction, request.target_characters)
         
         return result
     except Exception as e:
@@ -473,11 +511,12 @@ async def change_voice(session_id: str, request: ChangeVoiceRequest):
     """阶段二：手动更换角色音色"""
     try:
         pipeline = _get_or_create_pipeline(session_id)
-        result = pipeline.stage2_change_voice(
-            request.character,
-            request.voice_id,
-            request.voice_name or "",
-        )
+        async with _lock_for(session_id):
+            result = pipeline.stage2_change_voice(
+                request.character,
+                request.voice_id,
+                request.voice_name or "",
+            )
         return result
     except Exception as e:
         logger.exception(f"更换音色失败: {session_id}")
@@ -490,10 +529,11 @@ async def confirm_stage2(session_id: str):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        if not pipeline.voice_mapping:
-            return {"success": False, "error": "音色映射为空"}
-        
-        pipeline._update_status(SessionStatus.VOICE_READY)
+        async with _lock_for(session_id):
+            if not pipeline.voice_mapping:
+                return {"success": False, "error": "音色映射为空"}
+            
+            pipeline._update_status(SessionStatus.VOICE_READY)
         
         return {
             "success": True,
@@ -515,34 +555,69 @@ async def synthesize_audio(session_id: str):
     try:
         pipeline = _get_or_create_pipeline(session_id)
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            _executor,
-            lambda: asyncio.run(pipeline.stage3_synthesize())
-        )
+        async with _lock_for(session_id):
+            result = await pipeline.stage3_synthesize()
+
+        if result.get("success") and is_tos_upload_enabled():
+            result["audio_file_urls"], result["merged_audio_url"] = await upload_session_audio(
+                session_id, result.get("audio_files"), result.get("merged_audio"),
+            )
+
+        return result
+    except Exception as e:
+        logger.exception(f"合成失败: {session_id}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if result.get("success") and _is_tos_upload_enabled():
-            audio_file_urls: List[dict] = []
-            merged_audio_url: Optional[dict] = None
 
-            try:
-                for local_path in result.get("audio_files", []) or []:
-                    uploaded = _upload_file_to_tos(local_path=local_path, session_id=session_id)
-                    if uploaded:
-                        audio_file_urls.append(uploaded)
+@router.post("/sessions/{session_id}/upload-urls")
+async def create_upload_urls(session_id: str, request: UploadUrlsRequest):
+    """为客户端直传 TOS 签发预签名 URL，音频无需经由 API 服务器中转"""
+    if get_tos_settings() is None:
+        raise HTTPException(status_code=503, detail="TOS 未配置")
 
-                merged_path = result.get("merged_audio")
-                if merged_path:
-                    merged_audio_url = _upload_file_to_tos(local_path=merged_path, session_id=session_id)
-            except Exception:
-                logger.exception("tos_upload_failed")
+    uploads = [presign_tos_object(filename, session_id) for filename in request.filenames]
+    return {"success": True, "uploads": uploads}
 
-            result["audio_file_urls"] = audio_file_urls
-            result["merged_audio_url"] = merged_audio_url
 
+# ============================================================================
+#                              全流程 API
+# ============================================================================
+
+@router.post("/sessions/{session_id}/run-pipeline")
+async def run_pipeline(session_id: str, request: AnalyzeRequest):
+    """一次请求依次执行分析、匹配、合成（分步接口仍可用于手动调整）"""
+    try:
+        pipeline = _get_or_create_pipeline(session_id)
+        
+        async with _lock_for(session_id):
+            result = await pipeline.run_all(request.user_input)
+        
         return result
     except Exception as e:
-        logger.exception(f"合成失败: {session_id}")
+        logger.exception(f"全流程执行失败: {session_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/sessions/{session_id}/run-pipeline/stream")
+async def run_pipeline_stream(session_id: str, request: AnalyzeRequest):
+    """全流程（流式输出）：每个阶段开始时推送 {"type": "stage", "stage": n}"""
+    try:
+        pipeline = _get_or_create_pipeline(session_id)
+        
+        return StreamingResponse(
+            _stream_stage_events(
+                session_id,
+                lambda emit: pipeline.run_all(
+                    request.user_input,
+                    on_chunk=emit,
+                    on_stage=lambda stage: emit({"type": "stage", "stage": stage}),
+                ),
+            ),
+            media_type="text/event-stream",
+            headers=_SSE_HEADERS,
+        )
+    except Exception as e:
+        logger.exception(f"流式全流程执行失败: {session_id}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -550,21 +625,47 @@ async def synthesize_audio(session_id: str):
 #                              音频文件下载 API
 # ============================================================================
 
+class _AudioFileResponse(FileResponse):
+    """音频下载响应，加大读取块以减少系统调用次数"""
+    chunk_size = 1024 * 1024
+
+
+async def _audio_file_response(request: Request, file_path: str, filename: str) -> Response:
+    """
+    返回音频文件，只 stat 一次并复用给 FileResponse
+    
+    ETag 由 mtime 和大小生成；重新合成会改变 mtime，因此使用 no-cache
+    让浏览器每次校验，未变化时返回 304 而不重新下载。
+    """
+    try:
+        # stat 放到线程中执行，网络文件系统上的慢 stat 不阻塞事件循环
+        st = await asyncio.to_thread(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    
+    etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return _AudioFileResponse(
+        file_path,
+        media_type="audio/mpeg",
+        filename=filename,
+        stat_result=st,
+        headers=headers,
+    )
+
+
 @router.get("/audio/{session_id}/{filename}")
-async def get_audio_file(session_id: str, filename: str):
+async def get_audio_file(session_id: str, filename: str, request: Request):
     """获取音频文件"""
     try:
-        pipeline = _get_or_create_pipeline(session_id)
-        file_path = os.path.join(pipeline.output_dir, filename)
-        
-        if not os.path.exists(file_path):
+        # 按目录约定直接定位文件，避免每次下载/拖动进度都加载会话
+        if session_id.startswith(".") or filename.startswith("."):
             raise HTTPException(status_code=404, detail="文件不存在")
-        
-        return FileResponse(
-            file_path,
-            media_type="audio/mpeg",
-            filename=filename,
-        )
+        file_path = os.path.join(session_output_dir(session_id), filename)
+        return await _audio_file_response(request, file_path, filename)
     except HTTPException:
         raise
     except Exception as e:
@@ -573,22 +674,14 @@ async def get_audio_file(session_id: str, filename: str):
 
 
 @router.get("/sessions/{session_id}/merged-audio")
-async def get_merged_audio(session_id: str):
+async def get_merged_audio(session_id: str, request: Request):
     """获取合并后的音频"""
     try:
-        pipeline = _get_or_create_pipeline(session_id)
-        
-        if not pipeline.merged_audio:
+        # 与 get_audio_file 相同，按目录约定定位合并文件，不加载会话
+        if session_id.startswith("."):
             raise HTTPException(status_code=404, detail="合并音频不存在")
-        
-        if not os.path.exists(pipeline.merged_audio):
-            raise HTTPException(status_code=404, detail="文件不存在")
-        
-        return FileResponse(
-            pipeline.merged_audio,
-            media_type="audio/mpeg",
-            filename="dialogue_full.mp3",
-        )
+        file_path = os.path.join(session_output_dir(session_id), MERGED_AUDIO_FILENAME)
+        return await _audio_file_response(request, file_path, MERGED_AUDIO_FILENAME)
     except HTTPException:
         raise
     except Exception as e:
@@ -600,6 +693,14 @@ async def get_merged_audio(session_id: str):
 #                              音色查询 API
 # ============================================================================
 
+@lru_cache(maxsize=None)
+def _all_voices_body(limit: int) -> bytes:
+    """无筛选条件时的 /voices 响应体，按 limit 预序列化"""
+    return orjson.dumps(
+        {"success": True, "voices": ALL_VOICES[:limit], "total": len(ALL_VOICES)}
+    )
+
+
 @router.get("/voices")
 async def list_voices(
     category: Optional[str] = None,
@@ -608,19 +709,20 @@ async def list_voices(
 ):
     """获取可用音色列表"""
     try:
-        voices = ALL_VOICES
-        
-        if category:
-            voices = get_voices_by_category(category)
-        
-        if gender:
-            voices = [v for v in voices if v.get("gender") == gender]
+        if category and gender:
+            voices = _VOICES_BY_CG.get((category, gender), [])
+        elif category:
+            voices = _VOICES_BY_CATEGORY.get(category, [])
+        elif gender:
+            voices = _VOICES_BY_GENDER.get(gender, [])
+        else:
+            return Response(content=_all_voices_body(limit), media_type="application/json")
         
-        return {
+        return ORJSONResponse({
             "success": True,
             "voices": voices[:limit],
             "total": len(voices),
-        }
+        })
     except Exception as e:
         logger.exception("获取音色列表失败")
         raise HTTPException(status_code=500, detail=str(e))
@@ -630,7 +732,7 @@ async def list_voices(
 async def get_voice_detail(voice_id: str):
     """获取音色详情"""
     try:
-        voice = get_voice_by_id(voice_id)
+        voice = _VOICE_INDEX.get(voice_id)
         if not voice:
             raise HTTPException(status_code=404, detail="音色不存在")
         
@@ -642,23 +744,68 @@ async def get_voice_detail(voice_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/voice-categories")
-async def get_voice_categories():
-    """获取音色分类"""
-    categories = [
+# 音色分类为静态数据，导入时序列化一次
+_VOICE_CATEGORIES_BODY = orjson.dumps({
+    "success": True,
+    "categories": [
         {"id": "female_2.0", "name": "女声 2.0", "count": 10},
         {"id": "male_2.0", "name": "男声 2.0", "count": 10},
         {"id": "female_emotion", "name": "女声多情感", "count": 10},
         {"id": "male_emotion", "name": "男声多情感", "count": 10},
         {"id": "roleplay", "name": "角色扮演", "count": 10},
-    ]
-    return {"success": True, "categories": categories}
+    ],
+})
+
+
+@router.get("/voice-categories")
+async def get_voice_categories():
+    """获取音色分类"""
+    return Response(
+        content=_VOICE_CATEGORIES_BODY,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"},
+    )
 
 
 # ============================================================================
 #                              试听 API
 # ============================================================================
 
+@lru_cache(maxsize=1)
+def _preview_service():
+    """试听用的 TTS 服务实例（auto 模式按音色选择资源，可共用一个实例）"""
+    from backend.services import DoubaoTTSService
+    
+    return DoubaoTTSService()
+
+
+def _synthesize_preview_cached(voice_id: str, text: str) -> Dict[str, Any]:
+    """试听合成，经由共享合成缓存：命中时直接返回缓存文件，不调用 TTS 接口"""
+    from backend.models import TTSConfig
+    from backend.services import cached_audio_path
+    
+    service = _preview_service()
+    config = TTSConfig(voice_type=voice_id)
+    key = service.cache_key(text, config, auto=True)
+    cache_path = cached_audio_path(key)
+    if cache_path:
+        return {"success": True, "audio_path": cache_path, "cached": True}
+    
+    result = service.synthesize_to_file(text, config, auto=True)
+    if not result.success:
+        return {"success": False, "error": result.error_message or "合成失败"}
+    
+    # 合成结果已写入共享缓存：直接用缓存文件响应，删除临时输出，避免同一段音频存两份
+    cache_path = cached_audio_path(key)
+    if cache_path is None:
+        return {"success": True, "audio_path": result.audio_path}
+    try:
+        os.remove(result.audio_path)
+    except OSError:
+        pass
+    return {"success": True, "audio_path": cache_path}
+
+
 @router.post("/preview")
 async def preview_voice(
     voice_id: str = Body(...),
@@ -666,12 +813,8 @@ async def preview_voice(
 ):
     """试听音色"""
     try:
-        from agent.tools import tts_preview
-        
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            _executor,
-            lambda: tts_preview.invoke({"text": text, "voice_id": voice_id})
+        result = await anyio.to_thread.run_sync(
+            _synthesize_preview_cached, voice_id, text, limiter=_tts_limiter,
         )
         
         if result.get("success") and result.get("audio_path"):
@@ -689,14 +832,65 @@ async def preview_voice(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/preview/batch")
+async def preview_voices_batch(request: BatchPreviewRequest):
+    """批量试听音色：一次请求并发合成多条试听音频"""
+    from agent.tools import tts_preview
+    
+    # 指定会话时写入会话目录，便于通过 /audio/{session_id}/{filename} 访问
+    output_dir = None
+    if request.session_id:
+        output_dir = session_output_dir(request.session_id)
+    
+    results = await asyncio.gather(*(
+        anyio.to_thread.run_sync(
+            tts_preview.invoke,
+            {"text": item.text, "voice_id": item.voice_id, "output_dir": output_dir},
+            limiter=_tts_limiter,
+        )
+        for item in request.items
+    ), return_exceptions=True)
+    
+    previews = []
+    for item, result in zip(request.items, results):
+        if isinstance(result, Exception):
+            logger.error(f"试听失败: {item.voice_id}: {result}")
+            result = {"success": False, "error": str(result)}
+        preview = {"voice_id": item.voice_id, **result}
+        if request.session_id and result.get("audio_path"):
+            preview["filename"] = os.path.basename(result["audio_path"])
+        previews.append(preview)
+    
+    return {
+        "success": all(p.get("success") for p in previews),
+        "previews": previews,
+    }
+
+
 # ============================================================================
 #                              健康检查
 # ============================================================================
 
+@lru_cache(maxsize=1)
+def _health_body() -> bytes:
+    """健康检查响应体；事件循环在进程内不变，首次请求时序列化一次"""
+    return orjson.dumps({
+        "status": "ok",
+        "service": "tts-agent",
+        "event_loop": type(asyncio.get_running_loop()).__module__,
+    })
+
+
 @router.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "ok", "service": "tts-agent"}
+    return Response(content=_health_body(), media_type="application/json")
+
+
+@router.get("/admin/cache/stats")
+async def pipeline_cache_stats():
+    """pipeline 缓存统计"""
+    return {"success": True, "pipeline_cache": _pipeline_cache.stats()}
 
 
 @router.get("/debug/tts-credentials")
@@ -706,7 +900,7 @@ async def debug_tts_credentials():
     def fp(value: str) -> str:
         if not value:
             return ""
-        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:8]
+        return hashlib.sha256(value.encode("utf-8")).digest()[:4].hex()
 
     svc = DoubaoTTSService()
     env_presence = {}
@@ -6,6 +6,7 @@ TTS Agent 配置文件
 """
 
 import os
+import importlib.util
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -31,9 +32,22 @@ LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "60000"))
 
 DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "tts_agent.db"))
 DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# ========== 合成缓存配置 ==========
+
+SYNTHESIS_CACHE_DIR = os.getenv("SYNTHESIS_CACHE_DIR", os.path.join(DATA_DIR, "cache"))
+SYNTHESIS_CACHE_MAX_BYTES = int(os.getenv("SYNTHESIS_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
 
 # ========== 服务配置 ==========
 
 SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
 SERVER_PORT = int(os.getenv("SERVER_PORT", "8766"))
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
+
+# 事件循环：优先使用 uvloop（uvicorn[standard] 在非 Windows 平台会安装），SSE 小包写入开销更低
+SERVER_LOOP = os.getenv("SERVER_LOOP") or ("uvloop" if importlib.util.find_spec("uvloop") else "asyncio")
+# HTTP 解析器：优先使用 httptools（C 实现），否则回退到纯 Python 的 h11
+SERVER_HTTP = os.getenv("SERVER_HTTP") or ("httptools" if importlib.util.find_spec("httptools") else "h11")
@@ -13,17 +13,27 @@ from enum import Enum
 
 from sqlalchemy import (
     create_engine, Column, Integer, String, Text, Boolean, DateTime,
-    ForeignKey, Index
+    ForeignKey, Index, event, insert, inspect, text as sql_text
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.orm import sessionmaker, relationship, deferred, Session
 
-from ..config import DATABASE_PATH, DATA_DIR
+from ..config import DATABASE_PATH, DATA_DIR, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE
+
+
+try:
+    _uuid7 = uuid.uuid7  # Python 3.14+
+except AttributeError:
+    from uuid_extensions import uuid7 as _uuid7
 
 
 def generate_session_id() -> str:
-    """生成会话 UUID"""
-    return str(uuid.uuid4())
+    """
+    生成会话 UUID
+    
+    使用按时间递增的 UUIDv7，新会话总是追加在唯一索引末尾，避免随机 UUID 造成的页分裂。
+    """
+    return str(_uuid7())
 
 
 # ============================================================================
@@ -60,6 +70,32 @@ _engine = None
 _SessionLocal = None
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """WAL 模式下读写互不阻塞，synchronous=NORMAL 减少每次提交的 fsync"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+# 建表之后新增的可空列：(表名, 列名, 列类型)，旧库启动时自动补齐
+_ADDED_COLUMNS = (
+    ("tts_dialogue_items", "audio_hash", "VARCHAR(32)"),
+)
+
+
+def _ensure_added_columns(engine) -> None:
+    """create_all 不会修改已存在的表，这里为旧库补齐新增列"""
+    inspector = inspect(engine)
+    for table, column, column_type in _ADDED_COLUMNS:
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing:
+            with engine.begin() as conn:
+                conn.execute(sql_text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+
 def init_database(db_path: str = None) -> None:
     """
     初始化数据库
@@ -78,12 +114,18 @@ def init_database(db_path: str = None) -> None:
     # 创建引擎
     _engine = create_engine(
         f"sqlite:///{db_path}",
-        connect_args={"check_same_thread": False},
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=DB_POOL_RECYCLE,
         echo=False,
     )
+    event.listen(_engine, "connect", _set_sqlite_pragmas)
     
     # 创建所有表
     Base.metadata.create_all(_engine)
+    _ensure_added_columns(_engine)
     
     # 创建会话工厂
     _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
@@ -110,14 +152,14 @@ class TTSSession(Base):
     __tablename__ = 'tts_sessions'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(String(64), unique=True, nullable=False, default=generate_session_id)
+    session_id = Column(String(64), unique=True, index=True, nullable=False, default=generate_session_id)
     project_id = Column(Integer, nullable=True)
     
     # 状态管理
     status = Column(String(32), default=SessionStatus.CREATED.value, nullable=False)
     
-    # 输入数据
-    user_input = Column(Text, nullable=True)
+    # 输入数据（大文本列归入 blobs 延迟加载组，需要时用 undefer_group("blobs") 一次取回）
+    user_input = deferred(Column(Text, nullable=True), group="blobs")
     input_type = Column(String(16), nullable=True)
     
     # 输出数据
@@ -125,7 +167,7 @@ class TTSSession(Base):
     total_duration_ms = Column(Integer, nullable=True)
     
     # 错误处理
-    error = Column(Text, nullable=True)
+    error = deferred(Column(Text, nullable=True), group="blobs")
     error_stage = Column(String(32), nullable=True)
     
     # 时间戳
@@ -138,25 +180,29 @@ class TTSSession(Base):
     
     # 索引
     __table_args__ = (
-        Index('idx_tts_sessions_status', 'status'),
+        Index('idx_tts_sessions_status_created', 'status', 'created_at'),
+        Index('idx_tts_sessions_project_created', 'project_id', 'created_at'),
         Index('idx_tts_sessions_created', 'created_at'),
     )
     
+    # to_dict 导出的列，时间戳保持 datetime 交给 orjson 序列化
+    _DICT_COLUMNS = (
+        "id",
+        "session_id",
+        "project_id",
+        "status",
+        "user_input",
+        "input_type",
+        "merged_audio_path",
+        "total_duration_ms",
+        "error",
+        "error_stage",
+        "created_at",
+        "updated_at",
+    )
+    
     def to_dict(self, include_dialogues: bool = False, include_voices: bool = False) -> Dict[str, Any]:
-        result = {
-            "id": self.id,
-            "session_id": self.session_id,
-            "project_id": self.project_id,
-            "status": self.status,
-            "user_input": self.user_input,
-            "input_type": self.input_type,
-            "merged_audio_path": self.merged_audio_path,
-            "total_duration_ms": self.total_duration_ms,
-            "error": self.error,
-            "error_stage": self.error_stage,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        result = {name: getattr(self, name) for name in self._DICT_COLUMNS}
         if include_dialogues:
             result["dialogue_items"] = [item.to_dict() for item in self.dialogue_items]
         if include_voices:
@@ -181,42 +227,60 @@ class TTSDialogueItem(Base):
     index = Column(Integer, nullable=False)
     character = Column(String(64), nullable=False)
     character_desc = Column(String(256), nullable=True)
-    text = Column(Text, nullable=False)
+    text = deferred(Column(Text, nullable=False), group="blobs")
     instruction = Column(String(512), nullable=True)
-    context = Column(Text, nullable=True)
+    context = deferred(Column(Text, nullable=True), group="blobs")
     
     # 合成结果
     audio_path = Column(String(512), nullable=True)
     duration_ms = Column(Integer, nullable=True)
+    audio_hash = Column(String(32), nullable=True)  # 合成参数哈希，与合成缓存键一致（2.0音色依赖上下文链，为空）
     
     # 时间戳
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # 关系
-    session = relationship("TTSSession", back_populates="dialogue_items")
+    # 关系（写入走批量 INSERT，不经过子→父导航；禁止隐式懒加载以免引入逐行查询）
+    session = relationship("TTSSession", back_populates="dialogue_items", lazy="raise_on_sql")
     
     # 索引
     __table_args__ = (
-        Index('idx_tts_dialogues_session', 'session_id'),
         Index('idx_tts_dialogues_index', 'session_id', 'index'),
     )
     
+    _DICT_COLUMNS = (
+        "id",
+        "session_id",
+        "index",
+        "character",
+        "character_desc",
+        "text",
+        "instruction",
+        "context",
+        "audio_path",
+        "duration_ms",
+        "audio_hash",
+        "created_at",
+        "updated_at",
+    )
+    
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "session_id": self.session_id,
-            "index": self.index,
-            "character": self.character,
-            "character_desc": self.character_desc,
-            "text": self.text,
-            "instruction": self.instruction,
-            "context": self.context,
-            "audio_path": self.audio_path,
-            "duration_ms": self.duration_ms,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        return {name: getattr(self, name) for name in self._DICT_COLUMNS}
+    
+    @classmethod
+    def bulk_create(cls, session: Session, rows: List[Dict[str, Any]]) -> int:
+        """
+        批量插入对话条目
+        
+        一条 executemany INSERT 写入所有行，不经过 unit-of-work 和 identity map。
+        
+        Returns:
+            插入的行数
+        """
+        if not rows:
+            return 0
+        session.execute(insert(cls), rows)
+        return len(rows)
 
 
 # ============================================================================
@@ -238,7 +302,7 @@ class TTSVoiceMapping(Base):
     # 音色信息
     voice_id = Column(String(128), nullable=False)
     voice_name = Column(String(128), nullable=True)
-    reason = Column(Text, nullable=True)
+    reason = deferred(Column(Text, nullable=True), group="blobs")
     
     # 试听信息
     preview_audio = Column(String(512), nullable=True)
@@ -249,24 +313,25 @@ class TTSVoiceMapping(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关系
-    session = relationship("TTSSession", back_populates="voice_mappings")
+    session = relationship("TTSSession", back_populates="voice_mappings", lazy="raise_on_sql")
     
     # 索引
     __table_args__ = (
-        Index('idx_tts_voices_session', 'session_id'),
         Index('idx_tts_voices_character', 'session_id', 'character', unique=True),
     )
     
+    _DICT_COLUMNS = (
+        "id",
+        "session_id",
+        "character",
+        "voice_id",
+        "voice_name",
+        "reason",
+        "preview_audio",
+        "preview_text",
+        "created_at",
+        "updated_at",
+    )
+    
     def to_dict(self) -> Dict[str, Any]:
-        return {
-            "id": self.id,
-            "session_id": self.session_id,
-            "character": self.character,
-            "voice_id": self.voice_id,
-            "voice_name": self.voice_name,
-            "reason": self.reason,
-            "preview_audio": self.preview_audio,
-            "preview_text": self.preview_text,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
+        return {name: getattr(self, name) for name in self._DICT_COLUMNS}
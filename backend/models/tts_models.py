@@ -6,7 +6,8 @@ TTS 数据模型
 """
 
 from dataclasses import dataclass, field
-from typing import Optional, Literal
+from functools import lru_cache
+from typing import Optional, Literal, Union
 from enum import Enum
 
 
@@ -37,7 +38,16 @@ class EmotionType(str, Enum):
     TENDER = "tender"
 
 
-@dataclass
+# TTSConfig 数值参数的取值范围：(字段名, 下限, 上限)，值为 None 时跳过
+_TTS_CONFIG_RANGES = (
+    ("speed_ratio", 0.1, 2.0),
+    ("loudness_ratio", 0.5, 2.0),
+    ("emotion_scale", 1, 5),
+)
+_TTS_SAMPLE_RATES = frozenset((8000, 16000, 24000))
+
+
+@dataclass(slots=True)
 class TTSConfig:
     """
     TTS 配置
@@ -73,34 +83,31 @@ class TTSConfig:
     
     def __post_init__(self):
         """参数验证"""
-        if not 0.1 <= self.speed_ratio <= 2.0:
-            raise ValueError(f"speed_ratio 必须在 0.1-2.0 之间，当前值: {self.speed_ratio}")
+        for name, lo, hi in _TTS_CONFIG_RANGES:
+            value = getattr(self, name)
+            if value is not None and not lo <= value <= hi:
+                raise ValueError(f"{name} 必须在 {lo}-{hi} 之间，当前值: {value}")
         
-        if not 0.5 <= self.loudness_ratio <= 2.0:
-            raise ValueError(f"loudness_ratio 必须在 0.5-2.0 之间，当前值: {self.loudness_ratio}")
-        
-        if self.sample_rate not in (8000, 16000, 24000):
+        if self.sample_rate not in _TTS_SAMPLE_RATES:
             raise ValueError(f"sample_rate 必须是 8000/16000/24000 之一，当前值: {self.sample_rate}")
         
-        if self.emotion_scale is not None and not 1 <= self.emotion_scale <= 5:
-            raise ValueError(f"emotion_scale 必须在 1-5 之间，当前值: {self.emotion_scale}")
-        
         if self.emotion:
             self.enable_emotion = True
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TTSResult:
     """
-    TTS 合成结果
+    TTS 合成结果（不可变）
     """
     success: bool
-    audio_data: Optional[bytes] = None
+    audio_data: Optional[Union[bytes, bytearray]] = None
     audio_path: Optional[str] = None
     duration_ms: Optional[int] = None
     error_code: Optional[int] = None
     error_message: Optional[str] = None
     request_id: Optional[str] = None
+    cached: bool = False  # 是否直接取自合成缓存（未请求接口）
     
     @classmethod
     def from_error(cls, code: int, message: str, request_id: str = None) -> "TTSResult":
@@ -114,7 +121,7 @@ class TTSResult:
     @classmethod
     def from_success(
         cls,
-        audio_data: bytes,
+        audio_data: Optional[Union[bytes, bytearray]],
         duration_ms: int = None,
         request_id: str = None,
         audio_path: str = None,
@@ -147,6 +154,7 @@ class VoicePresets:
     GAOLENG_EMO = "zh_female_gaolengyujie_emo_v2_mars_bigtts"
 
 
+@lru_cache(maxsize=512)
 def detect_voice_version(voice_type: str) -> str:
     """
     根据音色ID自动检测API版本
@@ -162,6 +170,7 @@ def detect_voice_version(voice_type: str) -> str:
         return "1.0"
 
 
+@lru_cache(maxsize=16)
 def get_resource_id(version: str, is_clone: bool = False) -> str:
     """
     根据版本获取对应的 Resource ID
@@ -6,15 +6,21 @@ FastAPI 应用主入口
 """
 
 import os
+import asyncio
 import logging
+from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+import orjson
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from .config import SERVER_HOST, SERVER_PORT, CORS_ORIGINS, DATA_DIR
+from .config import SERVER_HOST, SERVER_PORT, SERVER_LOOP, SERVER_HTTP, CORS_ORIGINS, DATA_DIR
 from .models import init_database
+from .services import aclose_async_http_client
 from .api import tts_router
 
 # 配置日志
@@ -25,22 +31,36 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class _JSONGZipMiddleware(GZipMiddleware):
+    """响应压缩：跳过音频下载（已压缩、需支持 Range）和 SSE 流（需逐帧实时推送）"""
+    
+    _SKIP_SUFFIXES = ("/stream", "/merged-audio")
+    _SKIP_PREFIXES = ("/api/tts/audio/", "/api/tts/preview")
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            if path.endswith(self._SKIP_SUFFIXES) or path.startswith(self._SKIP_PREFIXES):
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时
     logger.info("🚀 TTS Agent 服务启动中...")
     
-    # 初始化数据库
-    init_database()
+    # 确保数据目录存在并初始化数据库（建表等阻塞 IO 放到线程中执行）
+    await asyncio.to_thread(Path(DATA_DIR).mkdir, parents=True, exist_ok=True)
+    await asyncio.to_thread(init_database)
     logger.info("📦 数据库已初始化")
     
-    # 确保数据目录存在
-    os.makedirs(DATA_DIR, exist_ok=True)
-    
     yield
     
-    # 关闭时
+    # 关闭时：释放共享异步 HTTP 客户端的连接
+    await aclose_async_http_client()
     logger.info("👋 TTS Agent 服务关闭")
 
 
@@ -50,6 +70,7 @@ app = FastAPI(
     description="语音合成智能体 API 服务",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # 配置 CORS
@@ -61,6 +82,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压缩较大的 JSON 响应（会话详情、音色列表等）
+app.add_middleware(_JSONGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # 注册 API 路由
 app.include_router(tts_router, prefix="/api/tts", tags=["TTS"])
 
@@ -79,10 +103,13 @@ async def root():
     }
 
 
+_HEALTH_BODY = orjson.dumps({"status": "ok"})
+
+
 @app.get("/api/health")
 async def health():
     """全局健康检查"""
-    return {"status": "ok"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 def run_server():
@@ -91,11 +118,17 @@ def run_server():
     
     logger.info(f"🌐 服务将运行在 http://{SERVER_HOST}:{SERVER_PORT}")
     
+    dev = (os.getenv("DEV") or "").strip().lower() in {"1", "true", "yes", "on"}
+    
+    # 会话 pipeline 缓存与会话锁都在进程内，只能单 worker 运行
     uvicorn.run(
         "backend.server:app",
         host=SERVER_HOST,
         port=SERVER_PORT,
-        reload=True,
+        reload=dev,  # 文件监听仅在开发环境开启
+        loop=SERVER_LOOP,
+        http=SERVER_HTTP,
+        access_log=dev,
         log_level="info",
     )
 
@@ -3,10 +3,31 @@
 后端服务模块
 """
 
-from .tts_service import DoubaoTTSService, MultiTurnTTSSession, TTSSynthesisItem
+from .tts_service import DoubaoTTSService, MultiTurnTTSSession, TTSSynthesisItem, aclose_async_http_client
+from .synthesis_cache import (
+    synthesis_cache_key, cached_audio_path, fetch_cached_audio, fetch_cached_metadata,
+    store_cached_audio, trim_synthesis_cache,
+)
+from .tos_storage import (
+    TOS_UPLOAD_CONCURRENCY, get_tos_settings, is_tos_upload_enabled, presign_tos_object,
+    upload_file_to_tos, upload_session_audio,
+)
 
 __all__ = [
     "DoubaoTTSService",
     "MultiTurnTTSSession",
     "TTSSynthesisItem",
+    "aclose_async_http_client",
+    "synthesis_cache_key",
+    "cached_audio_path",
+    "fetch_cached_audio",
+    "fetch_cached_metadata",
+    "store_cached_audio",
+    "trim_synthesis_cache",
+    "TOS_UPLOAD_CONCURRENCY",
+    "get_tos_settings",
+    "is_tos_upload_enabled",
+    "presign_tos_object",
+    "upload_file_to_tos",
+    "upload_session_audio",
 ]
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+合成音频磁盘缓存
+
+按合成参数哈希寻址（SYNTHESIS_CACHE_DIR/<hash[:2]>/<hash>.mp3），
+相同 (文本, 音色, 情绪参数...) 的句子直接复用已合成的音频，重试或编辑后重新合成时不再调用 TTS 接口。
+合成结果的元数据（request_id、duration_ms）存放在同名 .json 中，命中时与未命中返回相同字段。
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import orjson
+
+from ..config import SYNTHESIS_CACHE_DIR, SYNTHESIS_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# 新写入的缓存累计超过该字节数才淘汰一次，避免每次写入都全量扫描缓存目录
+_TRIM_INTERVAL_BYTES = max(SYNTHESIS_CACHE_MAX_BYTES // 20, 1)
+_bytes_since_trim = 0
+_trim_lock = threading.Lock()
+
+
+def synthesis_cache_key(text: str, voice_id: str, *params: Any) -> str:
+    """由文本、音色和其余影响合成结果的参数计算缓存键"""
+    parts = [text, voice_id]
+    parts.extend("" if p is None else str(p) for p in params)
+    return hashlib.blake2b("\x00".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(SYNTHESIS_CACHE_DIR, key[:2], f"{key}.mp3")
+
+
+def _metadata_path(cache_path: str) -> str:
+    return os.path.splitext(cache_path)[0] + ".json"
+
+
+def cached_audio_path(key: str) -> Optional[str]:
+    """
+    查找缓存，命中时返回缓存文件本身的路径（只读使用，不复制）
+
+    Returns:
+        命中返回缓存文件路径，未命中返回 None
+    """
+    cache_path = _cache_path(key)
+    try:
+        # 以 mtime 记录最近使用时间，供淘汰时参考
+        os.utime(cache_path)
+    except FileNotFoundError:
+        return None
+    return cache_path
+
+
+def fetch_cached_audio(key: str, output_path: str) -> Optional[str]:
+    """
+    查找缓存，命中时复制到 output_path
+
+    Returns:
+        命中返回 output_path，未命中返回 None
+    """
+    cache_path = cached_audio_path(key)
+    if cache_path is None:
+        return None
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    # 复制而非硬链接：会话文件之后可能被原地覆盖写入
+    shutil.copyfile(cache_path, output_path)
+    return output_path
+
+
+def fetch_cached_metadata(key: str) -> Dict[str, Any]:
+    """读取缓存条目的元数据，缺失或损坏时返回空字典"""
+    try:
+        with open(_metadata_path(_cache_path(key)), "rb") as f:
+            metadata = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def _write_atomic(directory: str, dest: str, write) -> Any:
+    """写入 directory 下独占的临时文件后原子替换到 dest，失败时清理临时文件；返回 write 的返回值"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            written = write(dst)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return written
+
+
+def store_cached_audio(key: str, audio_path: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    把合成好的音频写入缓存（先写临时文件再原子替换），累计写入足够多时顺带淘汰旧文件
+
+    metadata 先于音频写入，音频可见时元数据已经就绪。
+    """
+    cache_path = _cache_path(key)
+    
+    def copy_audio(dst) -> int:
+        with open(audio_path, "rb") as src:
+            shutil.copyfileobj(src, dst)
+        return dst.tell()
+    
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        # 每次写入独占一个临时文件：线程池并发写同一键时不会互相覆盖半成品
+        if metadata:
+            payload = orjson.dumps(metadata)
+            _write_atomic(cache_dir, _metadata_path(cache_path), lambda dst: dst.write(payload))
+        stored = _write_atomic(cache_dir, cache_path, copy_audio)
+    except OSError as e:
+        logger.warning(f"写入合成缓存失败: {e}")
+        return
+    
+    global _bytes_since_trim
+    with _trim_lock:
+        _bytes_since_trim += stored
+        due = _bytes_since_trim >= _TRIM_INTERVAL_BYTES
+        if due:
+            _bytes_since_trim = 0
+    if due:
+        trim_synthesis_cache()
+
+
+def trim_synthesis_cache() -> None:
+    """缓存总大小超过上限时，按最近使用时间淘汰最旧的文件"""
+    stats = []
+    try:
+        shards = [e.path for e in os.scandir(SYNTHESIS_CACHE_DIR) if e.is_dir()]
+    except FileNotFoundError:
+        return
+    for shard in shards:
+        try:
+            stats.extend((e.path, e.stat()) for e in os.scandir(shard) if e.name.endswith(".mp3"))
+        except OSError:
+            continue
+
+    total = sum(st.st_size for _, st in stats)
+    if total <= SYNTHESIS_CACHE_MAX_BYTES:
+        return
+
+    for path, st in sorted(stats, key=lambda item: item[1].st_mtime):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        try:
+            os.remove(_metadata_path(path))
+        except OSError:
+            pass
+        total -= st.st_size
+        if total <= SYNTHESIS_CACHE_MAX_BYTES:
+            break
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+TOS 对象存储上传
+
+API 服务和 AgentKit 入口共用：TosClientV2 按凭据缓存复用连接池，
+文件通过预签名 PUT URL 在事件循环上异步上传，不再为每个文件新建客户端。
+"""
+
+import os
+import re
+import asyncio
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# 同一批次内同时上传的文件数上限
+TOS_UPLOAD_CONCURRENCY = int(os.getenv("TOS_UPLOAD_CONCURRENCY", "8"))
+
+_OBJECT_NAME_UNSAFE_RE = re.compile(r"[^0-9A-Za-z._-]+")
+
+_TOS_CONTENT_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".ogg": "audio/ogg",
+    ".pcm": "application/octet-stream",
+}
+
+
+def _sanitize_object_name(name: str) -> str:
+    cleaned = _OBJECT_NAME_UNSAFE_RE.sub("_", name.strip())
+    cleaned = cleaned.strip("._-")
+    return cleaned or "file"
+
+
+@lru_cache(maxsize=1)
+def _build_tos_client(ak: str, sk: str, endpoint: str, region: str):
+    """按凭据缓存 TosClientV2，复用其 HTTPS 连接池"""
+    import tos
+
+    return tos.TosClientV2(ak, sk, endpoint, region)
+
+
+def _get_tos_client():
+    ak = os.getenv("TOS_ACCESS_KEY") or os.getenv("VOLCENGINE_ACCESS_KEY") or ""
+    sk = os.getenv("TOS_SECRET_KEY") or os.getenv("VOLCENGINE_SECRET_KEY") or ""
+    endpoint = os.getenv("TOS_ENDPOINT") or ""
+    region = os.getenv("TOS_REGION") or ""
+
+    if not (ak and sk and endpoint and region):
+        return None
+
+    try:
+        return _build_tos_client(ak, sk, endpoint, region)
+    except ImportError:
+        return None
+
+
+def get_tos_settings() -> Optional[tuple]:
+    """返回 (client, bucket, prefix, expires)，未配置时返回 None"""
+    client = _get_tos_client()
+    if client is None:
+        return None
+
+    bucket = os.getenv("TOS_BUCKET") or ""
+    if not bucket:
+        return None
+
+    prefix = (os.getenv("TOS_PREFIX") or "tts-agent-output").strip("/")
+    expires = int(os.getenv("TOS_URL_EXPIRES", "3600"))
+    return client, bucket, prefix, expires
+
+
+def is_tos_upload_enabled() -> bool:
+    return (os.getenv("TOS_UPLOAD_ENABLED") or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def presign_tos_object(
+    filename: str,
+    session_id: str,
+    content_type: Optional[str] = None,
+) -> Optional[dict]:
+    """为会话下的对象签发预签名 PUT（上传）和 GET（下载）URL"""
+    settings = get_tos_settings()
+    if settings is None:
+        return None
+    client, bucket, prefix, expires = settings
+
+    object_key = f"{prefix}/{session_id}/{_sanitize_object_name(filename)}"
+    return {
+        "bucket": bucket,
+        "key": object_key,
+        "content_type": content_type or _TOS_CONTENT_TYPES.get(Path(filename).suffix.lower()),
+        "put_url": client.generate_presigned_url("PUT", Bucket=bucket, Key=object_key, ExpiresIn=expires),
+        "url": client.generate_presigned_url("GET", Bucket=bucket, Key=object_key, ExpiresIn=expires),
+    }
+
+
+async def upload_file_to_tos(
+    http: aiohttp.ClientSession,
+    local_path: str,
+    session_id: str,
+    content_type: Optional[str] = None,
+) -> Optional[dict]:
+    """通过预签名 PUT URL 在事件循环上异步上传文件"""
+    p = Path(local_path)
+    if not await asyncio.to_thread(p.is_file):
+        return None
+
+    target = presign_tos_object(p.name, session_id, content_type)
+    if target is None:
+        return None
+
+    headers = {"Content-Type": target["content_type"]} if target["content_type"] else {}
+    with open(p, "rb") as f:
+        async with http.put(target["put_url"], data=f, headers=headers) as resp:
+            resp.raise_for_status()
+    return {"bucket": target["bucket"], "key": target["key"], "url": target["url"]}
+
+
+async def upload_session_audio(
+    session_id: str,
+    audio_files: Iterable[str],
+    merged_audio: Optional[str] = None,
+) -> Tuple[List[dict], Optional[dict]]:
+    """
+    并发上传会话的分句音频和合并音频，单个失败不影响其余文件
+
+    Returns:
+        (audio_file_urls, merged_audio_url)，上传失败或未配置的文件不出现在结果中
+    """
+    local_paths = list(audio_files or [])
+    if merged_audio:
+        local_paths.append(merged_audio)
+
+    semaphore = asyncio.Semaphore(TOS_UPLOAD_CONCURRENCY)
+
+    async def _upload(http: aiohttp.ClientSession, local_path: str) -> Optional[dict]:
+        async with semaphore:
+            return await upload_file_to_tos(http, local_path, session_id)
+
+    async with aiohttp.ClientSession() as http:
+        uploads = await asyncio.gather(
+            *(_upload(http, local_path) for local_path in local_paths),
+            return_exceptions=True,
+        )
+    for local_path, uploaded in zip(local_paths, uploads):
+        if isinstance(uploaded, Exception):
+            logger.error(f"tos_upload_failed: {local_path}: {uploaded}")
+
+    merged_upload = uploads.pop() if merged_audio else None
+    audio_file_urls = [u for u in uploads if u and not isinstance(u, Exception)]
+    return audio_file_urls, merged_upload if isinstance(merged_upload, dict) else None
+
+
+__all__ = [
+    "TOS_UPLOAD_CONCURRENCY",
+    "get_tos_settings",
+    "is_tos_upload_enabled",
+    "presign_tos_object",
+    "upload_file_to_tos",
+    "upload_session_audio",
+]
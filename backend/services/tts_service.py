@@ -7,18 +7,27 @@
 """
 
 import os
-import uuid
-import json
-import base64
+import atexit
+import re
+import secrets
+import asyncio
+import binascii
 import logging
 import tempfile
+import threading
+import importlib.util
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Union
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Optional, Union
 
 import httpx
+import orjson
 
 from ..models import TTSConfig, TTSResult, AudioEncoding, detect_voice_version, get_resource_id
 from ..config import DOUBAO_TTS_APP_ID, DOUBAO_TTS_ACCESS_TOKEN, DOUBAO_TTS_CLUSTER
+from .synthesis_cache import synthesis_cache_key, fetch_cached_audio, fetch_cached_metadata, store_cached_audio
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +36,280 @@ _VOICE_ALIASES: dict[str, str] = {
 }
 
 
+# 进程内共享的 HTTP 客户端：跨请求复用 TCP/TLS 连接（httpx.Client 可在多线程间共享）
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.Client:
+    """获取共享的同步 HTTP 客户端（安装了 h2 时启用 HTTP/2）"""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    http2=_HTTP2_AVAILABLE,
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                )
+                atexit.register(_http_client.close)
+    return _http_client
+
+
+# 异步客户端与并发上限按事件循环各建一份（AsyncClient / Semaphore 不能跨事件循环使用）；
+# 持有事件循环的一方（如 FastAPI lifespan）在关闭前调用 aclose_async_http_client 释放连接
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("TTS_ASYNC_MAX_IN_FLIGHT", "16"))
+_async_http_clients: dict[asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Semaphore]] = {}
+_async_http_clients_lock = threading.Lock()
+
+
+def _get_async_http_client() -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    """获取当前事件循环共享的异步 HTTP 客户端和在途请求信号量"""
+    loop = asyncio.get_running_loop()
+    entry = _async_http_clients.get(loop)
+    if entry is None:
+        with _async_http_clients_lock:
+            # 未显式关闭就已结束的事件循环（如 asyncio.run 的临时循环），其连接已随循环失效，直接丢弃
+            for stale in [l for l in _async_http_clients if l.is_closed()]:
+                del _async_http_clients[stale]
+            entry = _async_http_clients.get(loop)
+            if entry is None:
+                entry = (
+                    httpx.AsyncClient(
+                        http2=_HTTP2_AVAILABLE,
+                        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                    ),
+                    asyncio.Semaphore(ASYNC_MAX_IN_FLIGHT),
+                )
+                _async_http_clients[loop] = entry
+    return entry
+
+
+async def aclose_async_http_client() -> None:
+    """关闭当前事件循环的共享异步 HTTP 客户端（应用关闭时调用）"""
+    with _async_http_clients_lock:
+        entry = _async_http_clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].aclose()
+
+
+# 流式响应按原始字节读取，自行按换行分帧：跳过 iter_lines 对整段响应的 UTF-8 解码，orjson.loads 可直接解析 bytes
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_stream_lines(chunks: Iterable[bytes]) -> Iterator[bytearray]:
+    """把字节流切分为按行分隔的 JSON 帧"""
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        start = 0
+        while (nl := buf.find(b"\n", start)) >= 0:
+            line = buf[start:nl]
+            start = nl + 1
+            if line.strip():
+                yield line
+        del buf[:start]
+    if buf.strip():
+        yield buf
+
+
+async def _aiter_stream_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytearray]:
+    """_iter_stream_lines 的异步版本"""
+    buf = bytearray()
+    async for chunk in chunks:
+        buf += chunk
+        start = 0
+        while (nl := buf.find(b"\n", start)) >= 0:
+            line = buf[start:nl]
+            start = nl + 1
+            if line.strip():
+                yield line
+        del buf[:start]
+    if buf.strip():
+        yield buf
+
+
+_AUDIO_EXTENSIONS: dict[AudioEncoding, str] = {
+    AudioEncoding.MP3: ".mp3",
+    AudioEncoding.WAV: ".wav",
+    AudioEncoding.PCM: ".pcm",
+    AudioEncoding.OGG_OPUS: ".ogg",
+}
+
+# 已确认存在的输出目录，批量写入同一目录时不再重复 mkdir
+_ENSURED_DIRS: set[str] = set()
+
+
+def _ensure_dir(directory: str) -> None:
+    if directory and directory not in _ENSURED_DIRS:
+        os.makedirs(directory, exist_ok=True)
+        _ENSURED_DIRS.add(directory)
+
+
+def _ensure_parent_dir(path: str) -> None:
+    _ensure_dir(os.path.dirname(path))
+
+
+class _AudioSink:
+    """
+    合成音频的接收端
+
+    指定 path 时每帧解码后直接写入磁盘（先写 .part 临时文件，commit 时原子替换），
+    内存占用与音频长度无关；否则累积在内存中，作为 TTSResult.audio_data 返回。
+    未 commit 即退出（出错或未收到音频）时删除临时文件。
+    on_chunk 回调在每段音频到达时调用，调用方可以边合成边播放。
+    """
+
+    __slots__ = ("path", "size", "on_chunk", "_buffer", "_file", "_part_path")
+
+    def __init__(self, path: Optional[str] = None, on_chunk: Optional[Callable[[bytes], None]] = None):
+        self.path = path
+        self.size = 0
+        self.on_chunk = on_chunk
+        # 临时文件名带随机后缀，同一目标路径的并发请求（如推测重试）互不干扰
+        self._part_path = f"{path}.{os.urandom(4).hex()}.part" if path else None
+        self._buffer: Optional[bytearray] = None if path else bytearray()
+        self._file = None
+
+    def write(self, chunk: bytes) -> None:
+        if self._buffer is not None:
+            self._buffer += chunk
+        else:
+            if self._file is None:
+                _ensure_parent_dir(self.path)
+                self._file = open(self._part_path, "wb")
+            self._file.write(chunk)
+        self.size += len(chunk)
+        if self.on_chunk is not None:
+            self.on_chunk(chunk)
+
+    def commit(self) -> Optional[bytearray]:
+        """完成写入，返回内存中的音频数据（写入文件时返回 None）"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.replace(self._part_path, self.path)
+            logger.info("🔊 音频已保存: %s", self.path)
+        return self._buffer
+
+    def __enter__(self) -> "_AudioSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self._part_path)
+            except OSError:
+                pass
+
+    # 异步路径：文件模式下的磁盘操作放到线程池执行，避免阻塞事件循环上其他在途的合成请求
+    async def awrite(self, chunk: bytes) -> None:
+        if self._buffer is not None:
+            self.write(chunk)
+        else:
+            await asyncio.to_thread(self.write, chunk)
+
+    async def acommit(self) -> Optional[bytearray]:
+        if self._file is None:
+            return self.commit()
+        return await asyncio.to_thread(self.commit)
+
+    async def __aenter__(self) -> "_AudioSink":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._file is not None:
+            await asyncio.to_thread(self.__exit__, *exc_info)
+
+
+def _discard_speculative_audio(future: Future) -> None:
+    """删除推测重试中未被采用一方写出的音频文件"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if result.success and result.audio_path:
+        try:
+            os.remove(result.audio_path)
+        except OSError:
+            pass
+
+
+# 纯音频帧（占流中绝大多数）直接定位 base64 片段解码，跳过 JSON 解析；
+# 结束/错误帧或带其他字段的帧不匹配，照常交给 orjson
+_AUDIO_FRAME_RE = re.compile(
+    rb'\s*\{"code":\s*0,\s*(?:"message":\s*"[^"\\]*",\s*)?"data":\s*"([A-Za-z0-9+/=]+)"\s*\}\s*'
+)
+
+
+def _consume_stream(response: httpx.Response, sink: _AudioSink) -> Optional[tuple[int, str]]:
+    """
+    读取流式合成响应，把音频帧解码后写入 sink
+
+    Returns:
+        服务端返回的错误 (code, message)，正常结束时为 None
+    """
+    for line in _iter_stream_lines(response.iter_bytes(_STREAM_CHUNK_SIZE)):
+        frame = _AUDIO_FRAME_RE.fullmatch(line)
+        if frame:
+            sink.write(binascii.a2b_base64(memoryview(line)[frame.start(1):frame.end(1)]))
+            continue
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            logger.warning("🔊 JSON 解析警告: %s, line=%s", e, line[:100])
+            continue
+
+        code = data.get("code", 0)
+        # 成功结束标记
+        if code == 20000000:
+            logger.debug("🔊 合成结束: %s", data.get('message', ''))
+            return None
+        if code != 0:
+            message = data.get("message", "")
+            logger.error("🔊 合成错误: code=%s, message=%s", code, message)
+            return code, message
+
+        audio_base64 = data.get("data")
+        if audio_base64:
+            sink.write(binascii.a2b_base64(audio_base64))
+    return None
+
+
+async def _consume_stream_async(response: httpx.Response, sink: _AudioSink) -> Optional[tuple[int, str]]:
+    """_consume_stream 的异步版本"""
+    async for line in _aiter_stream_lines(response.aiter_bytes(_STREAM_CHUNK_SIZE)):
+        frame = _AUDIO_FRAME_RE.fullmatch(line)
+        if frame:
+            await sink.awrite(binascii.a2b_base64(memoryview(line)[frame.start(1):frame.end(1)]))
+            continue
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            logger.warning("🔊 JSON 解析警告: %s, line=%s", e, line[:100])
+            continue
+
+        code = data.get("code", 0)
+        if code == 20000000:
+            logger.debug("🔊 合成结束: %s", data.get('message', ''))
+            return None
+        if code != 0:
+            message = data.get("message", "")
+            logger.error("🔊 合成错误: code=%s, message=%s", code, message)
+            return code, message
+
+        audio_base64 = data.get("data")
+        if audio_base64:
+            await sink.awrite(binascii.a2b_base64(audio_base64))
+    return None
+
+
+def _new_request_id() -> str:
+    """生成请求 ID（128 位随机数的十六进制，省去 UUID 对象构造和格式化）"""
+    return os.urandom(16).hex()
+
+
 def _normalize_voice_type(voice_type: str) -> str:
     if not voice_type:
         return voice_type
@@ -40,16 +323,46 @@ def _is_clone_voice(voice_type: str) -> bool:
     return lower.startswith("icl_") or "_icl_" in lower
 
 
+# 官方音色 ID 的固定后缀；既不像复刻音色、也不带这些后缀的自定义 ID（如 S_xxx）无法确定该走哪个资源
+_STOCK_VOICE_SUFFIXES = ("_bigtts", "_tob")
+
+
+def _is_resource_ambiguous(voice_type: str) -> bool:
+    if not voice_type or _is_clone_voice(voice_type):
+        return False
+    return not voice_type.lower().endswith(_STOCK_VOICE_SUFFIXES)
+
+
+# 凭证相关环境变量在导入时读取一次（config 已在此之前加载 .env）
+_ENV_KEYS = (
+    "DOUBAO_TTS_APP_ID",
+    "DOUBAO_TTS_APP_KEY",
+    "DOUBAO_TTS_APPID",
+    "TTS_APP_ID",
+    "TTS_APP_KEY",
+    "DOUBAO_TTS_ACCESS_TOKEN",
+    "DOUBAO_TTS_AK",
+    "DOUBAO_TTS_ACCESS_KEY",
+    "TTS_ACCESS_KEY",
+    "DOUBAO_TTS_APP_ID_TTS2",
+    "DOUBAO_TTS_APP_KEY_TTS2",
+    "DOUBAO_TTS_APP_ID_2",
+    "DOUBAO_TTS_ACCESS_TOKEN_TTS2",
+    "DOUBAO_TTS_AK_TTS2",
+    "DOUBAO_TTS_ACCESS_TOKEN_2",
+    "DOUBAO_TTS_AK_2",
+)
+_ENV_SNAPSHOT: dict[str, Optional[str]] = {k: os.environ.get(k) for k in _ENV_KEYS}
+
+
+# 去掉凭证首尾的空白、反引号和引号（从 .env / 控制台复制时常被一起带上）
+_CREDENTIAL_PADDING_RE = re.compile(r"^[\s`'\"]*(.*?)[\s`'\"]*$", re.S)
+
+
 def _normalize_credential(value: Optional[str]) -> str:
     if value is None:
         return ""
-    normalized = str(value).strip()
-    if not normalized:
-        return ""
-    normalized = normalized.strip("`").strip()
-    if (normalized.startswith('"') and normalized.endswith('"')) or (normalized.startswith("'") and normalized.endswith("'")):
-        normalized = normalized[1:-1].strip()
-    return normalized
+    return _CREDENTIAL_PADDING_RE.match(str(value)).group(1)
 
 
 def _first_non_empty(*candidates: Optional[str]) -> str:
@@ -67,6 +380,74 @@ def _first_non_empty_with_source(candidates: list[tuple[str, Optional[str]]]) ->
     return "", ""
 
 
+_PAYLOAD_USER = {"uid": "novel_split_user"}
+
+
+@lru_cache(maxsize=256)
+def _request_body_template(
+    speaker: str,
+    encoding: str,
+    sample_rate: int,
+    speed_ratio: float,
+    loudness_ratio: float,
+    emotion: Optional[str],
+    emotion_scale: Optional[float],
+    explicit_language: Optional[str],
+    context_texts: Optional[tuple],
+    section_id: Optional[str],
+    model: Optional[str],
+) -> tuple[bytes, bytes]:
+    """
+    请求体中除 text 外的部分，只由音色和配置决定
+    
+    批量合成时同一音色/配置的句子共用一份，预先用 orjson 序列化为 text 前后两段 bytes，
+    每次请求只需序列化 text 并拼接。
+    """
+    # 音频参数
+    audio_params = {
+        "format": encoding,
+        "sample_rate": sample_rate,
+    }
+    
+    # 语速转换: speed_ratio [0.1, 2.0] -> speech_rate [-50, 100]
+    # 1.0 = 0, 2.0 = 100, 0.5 = -50
+    speech_rate = int((speed_ratio - 1.0) * 100)
+    audio_params["speech_rate"] = max(-50, min(100, speech_rate))
+    
+    # 音量转换: loudness_ratio [0.5, 2.0] -> loudness_rate [-50, 100]
+    loudness_rate = int((loudness_ratio - 1.0) * 100)
+    audio_params["loudness_rate"] = max(-50, min(100, loudness_rate))
+    
+    if emotion:
+        audio_params["emotion"] = emotion
+        if emotion_scale:
+            audio_params["emotion_scale"] = emotion_scale
+    
+    params = {
+        "speaker": speaker,
+        "audio_params": audio_params,
+    }
+    
+    # 模型版本
+    if model:
+        params["model"] = model
+    
+    # 附加参数
+    additions = {}
+    if explicit_language:
+        additions["explicit_language"] = explicit_language
+    if context_texts:
+        additions["context_texts"] = list(context_texts)
+    if section_id:
+        additions["section_id"] = section_id
+    if additions:
+        params["additions"] = orjson.dumps(additions).decode("utf-8")
+    
+    prefix = b'{"user":' + orjson.dumps(_PAYLOAD_USER) + b',"req_params":{"text":'
+    suffix = b"," + orjson.dumps(params)[1:] + b"}"
+    return prefix, suffix
+
+
 class DoubaoTTSService:
     """
     豆包语音合成服务 (V3 接口)
@@ -115,6 +496,7 @@ class DoubaoTTSService:
         access_token: Optional[str] = None,
         resource_id: str = "seed-tts-1.0",
         timeout: float = 60.0,
+        speculative_retry: bool = False,
     ):
         """
         初始化 TTS 服务
@@ -124,27 +506,31 @@ class DoubaoTTSService:
             access_token: 访问令牌，优先级: 参数 > 配置文件 > 环境变量
             resource_id: 资源 ID，默认 "seed-tts-1.0" (豆包语音合成模型1.0)
             timeout: 请求超时时间 (秒)
+            speculative_retry: synthesize_auto 遇到无法判断是否为复刻音色的自定义 ID 时，
+                同时向普通/复刻两个资源发起请求并取先成功者（会多消耗一次调用额度，默认关闭）
         """
         # 优先级: 参数 > 配置文件 > 环境变量
         self.app_id, self.app_id_source = _first_non_empty_with_source([
             ("arg:app_id", app_id),
             ("config:DOUBAO_TTS_APP_ID", DOUBAO_TTS_APP_ID),
-            ("env:DOUBAO_TTS_APP_ID", os.getenv("DOUBAO_TTS_APP_ID")),
-            ("env:DOUBAO_TTS_APP_KEY", os.getenv("DOUBAO_TTS_APP_KEY")),
-            ("env:DOUBAO_TTS_APPID", os.getenv("DOUBAO_TTS_APPID")),
-            ("env:TTS_APP_ID", os.getenv("TTS_APP_ID")),
-            ("env:TTS_APP_KEY", os.getenv("TTS_APP_KEY")),
+            ("env:DOUBAO_TTS_APP_ID", _ENV_SNAPSHOT.get("DOUBAO_TTS_APP_ID")),
+            ("env:DOUBAO_TTS_APP_KEY", _ENV_SNAPSHOT.get("DOUBAO_TTS_APP_KEY")),
+            ("env:DOUBAO_TTS_APPID", _ENV_SNAPSHOT.get("DOUBAO_TTS_APPID")),
+            ("env:TTS_APP_ID", _ENV_SNAPSHOT.get("TTS_APP_ID")),
+            ("env:TTS_APP_KEY", _ENV_SNAPSHOT.get("TTS_APP_KEY")),
         ])
         self.access_token, self.access_token_source = _first_non_empty_with_source([
             ("arg:access_token", access_token),
             ("config:DOUBAO_TTS_ACCESS_TOKEN", DOUBAO_TTS_ACCESS_TOKEN),
-            ("env:DOUBAO_TTS_ACCESS_TOKEN", os.getenv("DOUBAO_TTS_ACCESS_TOKEN")),
-            ("env:DOUBAO_TTS_AK", os.getenv("DOUBAO_TTS_AK")),
-            ("env:DOUBAO_TTS_ACCESS_KEY", os.getenv("DOUBAO_TTS_ACCESS_KEY")),
-            ("env:TTS_ACCESS_KEY", os.getenv("TTS_ACCESS_KEY")),
+            ("env:DOUBAO_TTS_ACCESS_TOKEN", _ENV_SNAPSHOT.get("DOUBAO_TTS_ACCESS_TOKEN")),
+            ("env:DOUBAO_TTS_AK", _ENV_SNAPSHOT.get("DOUBAO_TTS_AK")),
+            ("env:DOUBAO_TTS_ACCESS_KEY", _ENV_SNAPSHOT.get("DOUBAO_TTS_ACCESS_KEY")),
+            ("env:TTS_ACCESS_KEY", _ENV_SNAPSHOT.get("TTS_ACCESS_KEY")),
         ])
         self.resource_id = resource_id
         self.timeout = timeout
+        self.speculative_retry = speculative_retry
+        self._header_templates: dict[str, dict] = {}
         
         if not self.app_id:
             logger.warning("未设置 app_id，请在 config.py 或环境变量 DOUBAO_TTS_APP_ID 中设置")
@@ -154,36 +540,40 @@ class DoubaoTTSService:
     def _resolve_credentials_for_resource(self, resource_id: str) -> tuple[str, str, str, str]:
         if resource_id == "seed-tts-2.0":
             app_id, app_id_source = _first_non_empty_with_source([
-                ("env:DOUBAO_TTS_APP_ID_TTS2", os.getenv("DOUBAO_TTS_APP_ID_TTS2")),
-                ("env:DOUBAO_TTS_APP_KEY_TTS2", os.getenv("DOUBAO_TTS_APP_KEY_TTS2")),
-                ("env:DOUBAO_TTS_APP_ID_2", os.getenv("DOUBAO_TTS_APP_ID_2")),
+                ("env:DOUBAO_TTS_APP_ID_TTS2", _ENV_SNAPSHOT.get("DOUBAO_TTS_APP_ID_TTS2")),
+                ("env:DOUBAO_TTS_APP_KEY_TTS2", _ENV_SNAPSHOT.get("DOUBAO_TTS_APP_KEY_TTS2")),
+                ("env:DOUBAO_TTS_APP_ID_2", _ENV_SNAPSHOT.get("DOUBAO_TTS_APP_ID_2")),
                 ("fallback:self.app_id", self.app_id),
             ])
             access_token, access_token_source = _first_non_empty_with_source([
-                ("env:DOUBAO_TTS_ACCESS_TOKEN_TTS2", os.getenv("DOUBAO_TTS_ACCESS_TOKEN_TTS2")),
-                ("env:DOUBAO_TTS_AK_TTS2", os.getenv("DOUBAO_TTS_AK_TTS2")),
-                ("env:DOUBAO_TTS_ACCESS_TOKEN_2", os.getenv("DOUBAO_TTS_ACCESS_TOKEN_2")),
-                ("env:DOUBAO_TTS_AK_2", os.getenv("DOUBAO_TTS_AK_2")),
+                ("env:DOUBAO_TTS_ACCESS_TOKEN_TTS2", _ENV_SNAPSHOT.get("DOUBAO_TTS_ACCESS_TOKEN_TTS2")),
+                ("env:DOUBAO_TTS_AK_TTS2", _ENV_SNAPSHOT.get("DOUBAO_TTS_AK_TTS2")),
+                ("env:DOUBAO_TTS_ACCESS_TOKEN_2", _ENV_SNAPSHOT.get("DOUBAO_TTS_ACCESS_TOKEN_2")),
+                ("env:DOUBAO_TTS_AK_2", _ENV_SNAPSHOT.get("DOUBAO_TTS_AK_2")),
                 ("fallback:self.access_token", self.access_token),
             ])
             return app_id, access_token, app_id_source, access_token_source
         return self.app_id, self.access_token, self.app_id_source, self.access_token_source
 
     def _get_headers(self, request_id: Optional[str] = None, resource_id: Optional[str] = None) -> dict:
-        """获取 V3 请求头"""
+        """获取 V3 请求头（鉴权部分按 resource_id 解析一次后缓存为模板）"""
         actual_resource_id = resource_id or self.resource_id
-        app_id, access_token, _, _ = self._resolve_credentials_for_resource(actual_resource_id)
-        if not app_id or not access_token:
-            raise ValueError(
-                "豆包TTS鉴权缺失：请配置 DOUBAO_TTS_APP_ID 与 DOUBAO_TTS_AK/DOUBAO_TTS_ACCESS_TOKEN"
-            )
-        headers = {
-            "Content-Type": "application/json",
-            "X-Api-App-Id": app_id,
-            "X-Api-App-Key": app_id,
-            "X-Api-Access-Key": access_token,
-            "X-Api-Resource-Id": actual_resource_id,
-        }
+        template = self._header_templates.get(actual_resource_id)
+        if template is None:
+            app_id, access_token, _, _ = self._resolve_credentials_for_resource(actual_resource_id)
+            if not app_id or not access_token:
+                raise ValueError(
+                    "豆包TTS鉴权缺失：请配置 DOUBAO_TTS_APP_ID 与 DOUBAO_TTS_AK/DOUBAO_TTS_ACCESS_TOKEN"
+                )
+            template = {
+                "Content-Type": "application/json",
+                "X-Api-App-Id": app_id,
+                "X-Api-App-Key": app_id,
+                "X-Api-Access-Key": access_token,
+                "X-Api-Resource-Id": actual_resource_id,
+            }
+            self._header_templates[actual_resource_id] = template
+        headers = template.copy()
         if request_id:
             headers["X-Api-Request-Id"] = request_id
         return headers
@@ -194,7 +584,7 @@ class DoubaoTTSService:
         config: TTSConfig,
         context_texts: Optional[list[str]] = None,
         version: str = "1.0",
-    ) -> dict:
+    ) -> bytes:
         """
         构建 V3 请求体
         
@@ -205,71 +595,37 @@ class DoubaoTTSService:
             version: API版本 "1.0" 或 "2.0"
         
         Returns:
-            请求体字典
+            JSON 编码的请求体
         """
-        # 音频参数
-        audio_params = {
-            "format": config.encoding.value if isinstance(config.encoding, AudioEncoding) else config.encoding,
-            "sample_rate": config.sample_rate,
-        }
-        
-        # 语速转换: speed_ratio [0.1, 2.0] -> speech_rate [-50, 100]
-        # 1.0 = 0, 2.0 = 100, 0.5 = -50
-        speech_rate = int((config.speed_ratio - 1.0) * 100)
-        speech_rate = max(-50, min(100, speech_rate))
-        audio_params["speech_rate"] = speech_rate
-        
-        # 音量转换: loudness_ratio [0.5, 2.0] -> loudness_rate [-50, 100]
-        loudness_rate = int((config.loudness_ratio - 1.0) * 100)
-        loudness_rate = max(-50, min(100, loudness_rate))
-        audio_params["loudness_rate"] = loudness_rate
+        encoding = config.encoding.value if isinstance(config.encoding, AudioEncoding) else config.encoding
         
         # 情感设置 - 仅1.0版本使用emotion参数
-        if version == "1.0" and config.enable_emotion and config.emotion:
-            audio_params["emotion"] = config.emotion
-            if config.emotion_scale:
-                audio_params["emotion_scale"] = config.emotion_scale
-        
-        # 构建请求体
-        payload = {
-            "user": {
-                "uid": "novel_split_user",
-            },
-            "req_params": {
-                "text": text,
-                "speaker": config.voice_type,
-                "audio_params": audio_params,
-            },
-        }
-        
-        # 附加参数
-        additions = {}
+        emotion = config.emotion if version == "1.0" and config.enable_emotion else None
         
-        # 语种设置
-        if config.explicit_language:
-            additions["explicit_language"] = config.explicit_language
-
-        # 2.0版本：使用context_texts和section_id
+        # 2.0版本：使用context_texts和section_id（优先使用传入的context_texts，其次使用config中的）
+        # 1.0版本：也支持context_texts（兼容性保留）
         if version == "2.0":
-            # 优先使用传入的context_texts，其次使用config中的
             ctx = context_texts or config.context_texts
-            if ctx:
-                additions["context_texts"] = ctx
-            if config.section_id:
-                additions["section_id"] = config.section_id
+            section_id = config.section_id
         else:
-            # 1.0版本：也支持context_texts（兼容性保留）
-            if context_texts:
-                additions["context_texts"] = context_texts
-        
-        # 模型版本
-        if config.model:
-            payload["req_params"]["model"] = config.model
-        
-        if additions:
-            payload["req_params"]["additions"] = json.dumps(additions)
+            ctx = context_texts
+            section_id = None
+        
+        prefix, suffix = _request_body_template(
+            config.voice_type,
+            encoding,
+            config.sample_rate,
+            config.speed_ratio,
+            config.loudness_ratio,
+            emotion,
+            config.emotion_scale if emotion else None,
+            config.explicit_language,
+            tuple(ctx) if ctx else None,
+            section_id,
+            config.model,
+        )
         
-        return payload
+        return prefix + orjson.dumps(text) + suffix
 
     
     def synthesize(
@@ -278,6 +634,7 @@ class DoubaoTTSService:
         config: TTSConfig,
         output_path: Optional[str] = None,
         context_texts: Optional[list[str]] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
     ) -> TTSResult:
         """
         同步合成语音 (V3 流式接口)
@@ -285,111 +642,78 @@ class DoubaoTTSService:
         Args:
             text: 要合成的文本
             config: TTS 配置
-            output_path: 输出文件路径 (可选)，如果指定则保存音频到文件
+            output_path: 输出文件路径 (可选)，如果指定则边接收边写入文件，此时 audio_data 为 None
+            context_texts: 上下文指令 (可选)
+            on_chunk: 每收到一段音频时的回调 (可选)
         
         Returns:
             TTSResult: 合成结果
         """
         config.voice_type = _normalize_voice_type(config.voice_type)
-        req_id = str(uuid.uuid4())
+        req_id = _new_request_id()
+        saved_path = self._resolve_audio_path(output_path, config.encoding) if output_path else None
         
         # 构建请求
         payload = self._build_request_payload(text, config, context_texts=context_texts)
         
-        logger.info(f"🔊 开始合成语音: reqid={req_id[:8]}..., resource_id={self.resource_id}, voice={config.voice_type}")
-        logger.info(f"🔊 合成文本: {text[:100]}...")
+        logger.info("🔊 开始合成语音: reqid=%s..., resource_id=%s, voice=%s", req_id[:8], self.resource_id, config.voice_type)
+        logger.info("🔊 合成文本: %s...", text[:100])
         if context_texts:
-            logger.info(f"🔊 上下文: {context_texts[0][:100] if context_texts else '(无)'}...")
+            logger.info("🔊 上下文: %s...", context_texts[0][:100] if context_texts else '(无)')
         
         try:
             # 使用流式请求
-            with httpx.Client(timeout=self.timeout) as client:
-                with client.stream(
-                    "POST",
-                    self.API_URL,
-                    headers=self._get_headers(req_id),
-                    json=payload,
-                ) as response:
-                    # 获取 logid 用于问题追踪
-                    log_id = response.headers.get("X-Tt-Logid", "")
-                    
-                    # 检查 HTTP 状态
-                    if response.status_code != 200:
-                        error_text = response.read().decode("utf-8", errors="ignore")
-                        logger.error(f"🔊 HTTP 错误: status={response.status_code}, body={error_text[:200]}")
-                        _, _, app_id_source, access_token_source = self._resolve_credentials_for_resource(self.resource_id)
-                        return TTSResult.from_error(
-                            response.status_code,
-                            f"HTTP {response.status_code}: {error_text[:200]} (resource_id={self.resource_id}, app_id_source={app_id_source}, access_token_source={access_token_source})",
-                            req_id,
-                        )
-                    
-                    # 收集所有音频数据
-                    audio_chunks = []
-                    last_error = None
-                    
-                    for line in response.iter_lines():
-                        if not line:
-                            continue
-                        
-                        try:
-                            data = json.loads(line)
-                            code = data.get("code", 0)
-                            message = data.get("message", "")
-                            
-                            # 成功结束标记
-                            if code == 20000000:
-                                logger.debug(f"🔊 合成结束: {message}")
-                                break
-                            
-                            # 错误处理
-                            if code != 0:
-                                last_error = (code, message)
-                                logger.error(f"🔊 合成错误: code={code}, message={message}")
-                                break
-                            
-                            # 获取音频数据
-                            audio_base64 = data.get("data")
-                            if audio_base64:
-                                audio_chunk = base64.b64decode(audio_base64)
-                                audio_chunks.append(audio_chunk)
-                                
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"🔊 JSON 解析警告: {e}, line={line[:100]}")
-                            continue
-                    
-                    # 检查是否有错误
-                    if last_error:
-                        return TTSResult.from_error(last_error[0], last_error[1], req_id)
+            client = _get_http_client()
+            with client.stream(
+                "POST",
+                self.API_URL,
+                headers=self._get_headers(req_id),
+                content=payload,
+                timeout=self.timeout,
+            ) as response, _AudioSink(saved_path, on_chunk) as sink:
+                # 获取 logid 用于问题追踪
+                log_id = response.headers.get("X-Tt-Logid", "")
                     
-                    # 合并音频数据
-                    if not audio_chunks:
-                        logger.error(f"🔊 未收到音频数据: reqid={req_id}")
-                        return TTSResult.from_error(-1, "未收到音频数据", req_id)
+                # 检查 HTTP 状态
+                if response.status_code != 200:
+                    error_text = response.read().decode("utf-8", errors="ignore")
+                    logger.error("🔊 HTTP 错误: status=%s, body=%s", response.status_code, error_text[:200])
+                    _, _, app_id_source, access_token_source = self._resolve_credentials_for_resource(self.resource_id)
+                    return TTSResult.from_error(
+                        response.status_code,
+                        f"HTTP {response.status_code}: {error_text[:200]} (resource_id={self.resource_id}, app_id_source={app_id_source}, access_token_source={access_token_source})",
+                        req_id,
+                    )
                     
-                    audio_data = b"".join(audio_chunks)
+                # 收集所有音频数据
+                last_error = _consume_stream(response, sink)
+                
+                # 检查是否有错误
+                if last_error:
+                    return TTSResult.from_error(last_error[0], last_error[1], req_id)
                     
-                    logger.info(f"🔊 合成成功: reqid={req_id[:8]}..., size={len(audio_data)} bytes, chunks={len(audio_chunks)}")
+                # 合并音频数据
+                if not sink.size:
+                    logger.error("🔊 未收到音频数据: reqid=%s", req_id)
+                    return TTSResult.from_error(-1, "未收到音频数据", req_id)
                     
-                    # 保存到文件
-                    saved_path = None
-                    if output_path:
-                        saved_path = self._save_audio(audio_data, output_path, config.encoding)
+                logger.info("🔊 合成成功: reqid=%s..., size=%s bytes", req_id[:8], sink.size)
                     
-                    return TTSResult.from_success(
-                        audio_data=audio_data,
-                        request_id=req_id,
-                        audio_path=saved_path,
-                    )
+                # 保存到文件
+                return TTSResult.from_success(
+                    audio_data=sink.commit(),
+                    request_id=req_id,
+                    audio_path=saved_path,
+                )
                 
         except httpx.TimeoutException:
-            logger.error(f"🔊 请求超时: reqid={req_id}")
+            logger.error("🔊 请求超时: reqid=%s", req_id)
             return TTSResult.from_error(-1, "请求超时", req_id)
         except httpx.HTTPError as e:
-            logger.error(f"🔊 HTTP 错误: {e}")
+            logger.error("🔊 HTTP 错误: %s", e)
             return TTSResult.from_error(-1, f"HTTP 错误: {str(e)}", req_id)
         except Exception as e:
-            logger.error(f"🔊 未知错误: {e}")
+            logger.error("🔊 未知错误: %s", e)
             return TTSResult.from_error(-1, f"未知错误: {str(e)}", req_id)
     
     def synthesize_auto(
@@ -397,6 +721,7 @@ class DoubaoTTSService:
         text: str,
         config: TTSConfig,
         output_path: Optional[str] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
     ) -> TTSResult:
         """
         自动检测版本进行语音合成（推荐使用）
@@ -409,6 +734,7 @@ class DoubaoTTSService:
             text: 要合成的文本
             config: TTS配置（包含音色、情绪指令等）
             output_path: 输出文件路径（可选）
+            on_chunk: 每收到一段音频时的回调（可选）
             
         Returns:
             TTSResult: 合成结果
@@ -434,114 +760,89 @@ class DoubaoTTSService:
         is_clone = _is_clone_voice(config.voice_type)
         resource_id = get_resource_id(version, is_clone=is_clone)
         
-        req_id = str(uuid.uuid4())
+        # 推测重试会同时收到两路音频，需要逐段回调时不启用
+        if self.speculative_retry and on_chunk is None and _is_resource_ambiguous(config.voice_type):
+            alt_resource_id = get_resource_id(version, is_clone=not is_clone)
+            if alt_resource_id and alt_resource_id != resource_id:
+                return self._synthesize_speculative(text, config, output_path, version, resource_id, alt_resource_id)
+        
+        req_id = _new_request_id()
+        saved_path = self._resolve_audio_path(output_path, config.encoding) if output_path else None
         
         # 构建请求，传入版本信息
         payload = self._build_request_payload(text, config, version=version)
         
-        logger.info(f"🔊 [Auto] 开始合成: reqid={req_id[:8]}..., version={version}, resource_id={resource_id}, voice={config.voice_type}")
-        logger.info(f"🔊 合成文本: {text[:100]}...")
+        logger.info("🔊 [Auto] 开始合成: reqid=%s..., version=%s, resource_id=%s, voice=%s", req_id[:8], version, resource_id, config.voice_type)
+        logger.info("🔊 合成文本: %s...", text[:100])
         
         # 日志显示使用的参数
         if version == "2.0" and config.context_texts:
-            logger.info(f"🔊 情绪指令: {config.context_texts[0][:100]}...")
+            logger.info("🔊 情绪指令: %s...", config.context_texts[0][:100])
         elif version == "1.0" and config.emotion:
-            logger.info(f"🔊 情绪参数: emotion={config.emotion}, scale={config.emotion_scale}")
+            logger.info("🔊 情绪参数: emotion=%s, scale=%s", config.emotion, config.emotion_scale)
         
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                with client.stream(
-                    "POST",
-                    self.API_URL,
-                    headers=self._get_headers(req_id, resource_id=resource_id),
-                    json=payload,
-                ) as response:
-                    log_id = response.headers.get("X-Tt-Logid", "")
-                    
-                    if response.status_code != 200:
-                        error_text = response.read().decode("utf-8", errors="ignore")
-                        logger.error(f"🔊 HTTP 错误: status={response.status_code}, body={error_text[:200]}")
-                        _, _, app_id_source, access_token_source = self._resolve_credentials_for_resource(resource_id)
-                        return TTSResult.from_error(
-                            response.status_code,
-                            f"HTTP {response.status_code}: {error_text[:200]} (resource_id={resource_id}, app_id_source={app_id_source}, access_token_source={access_token_source})",
-                            req_id,
-                        )
-                    
-                    audio_chunks = []
-                    last_error = None
+            client = _get_http_client()
+            with client.stream(
+                "POST",
+                self.API_URL,
+                headers=self._get_headers(req_id, resource_id=resource_id),
+                content=payload,
+                timeout=self.timeout,
+            ) as response, _AudioSink(saved_path, on_chunk) as sink:
+                log_id = response.headers.get("X-Tt-Logid", "")
                     
-                    for line in response.iter_lines():
-                        if not line:
-                            continue
-                        
-                        try:
-                            data = json.loads(line)
-                            code = data.get("code", 0)
-                            message = data.get("message", "")
-                            
-                            if code == 20000000:
-                                logger.debug(f"🔊 合成结束: {message}")
-                                break
-                            
-                            if code != 0:
-                                last_error = (code, message)
-                                logger.error(f"🔊 合成错误: code={code}, message={message}")
-                                break
-                            
-                            audio_base64 = data.get("data")
-                            if audio_base64:
-                                audio_chunk = base64.b64decode(audio_base64)
-                                audio_chunks.append(audio_chunk)
-                                
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"🔊 JSON 解析警告: {e}, line={line[:100]}")
-                            continue
-                    
-                    if last_error:
-                        if (
-                            last_error[1]
-                            and "resource id is mismatched with speaker related resource" in str(last_error[1]).lower()
-                        ):
-                            alt_resource_id = get_resource_id(version, is_clone=not is_clone)
-                            if alt_resource_id and alt_resource_id != resource_id:
-                                retry = self._synthesize_auto_with_resource(
-                                    text=text,
-                                    config=config,
-                                    output_path=output_path,
-                                    version=version,
-                                    resource_id=alt_resource_id,
-                                )
-                                if retry.success:
-                                    return retry
-                        return TTSResult.from_error(last_error[0], last_error[1], req_id)
-                    
-                    if not audio_chunks:
-                        logger.error(f"🔊 未收到音频数据: reqid={req_id}")
-                        return TTSResult.from_error(-1, "未收到音频数据", req_id)
+                if response.status_code != 200:
+                    error_text = response.read().decode("utf-8", errors="ignore")
+                    logger.error("🔊 HTTP 错误: status=%s, body=%s", response.status_code, error_text[:200])
+                    _, _, app_id_source, access_token_source = self._resolve_credentials_for_resource(resource_id)
+                    return TTSResult.from_error(
+                        response.status_code,
+                        f"HTTP {response.status_code}: {error_text[:200]} (resource_id={resource_id}, app_id_source={app_id_source}, access_token_source={access_token_source})",
+                        req_id,
+                    )
                     
-                    audio_data = b"".join(audio_chunks)
+                last_error = _consume_stream(response, sink)
+                
+                if last_error:
+                    if (
+                        last_error[1]
+                        and "resource id is mismatched with speaker related resource" in str(last_error[1]).lower()
+                    ):
+                        alt_resource_id = get_resource_id(version, is_clone=not is_clone)
+                        if alt_resource_id and alt_resource_id != resource_id:
+                            retry = self._synthesize_auto_with_resource(
+                                text=text,
+                                config=config,
+                                output_path=output_path,
+                                version=version,
+                                resource_id=alt_resource_id,
+                                on_chunk=on_chunk,
+                            )
+                            if retry.success:
+                                return retry
+                    return TTSResult.from_error(last_error[0], last_error[1], req_id)
                     
-                    logger.info(f"🔊 [Auto] 合成成功: reqid={req_id[:8]}..., version={version}, size={len(audio_data)} bytes")
+                if not sink.size:
+                    logger.error("🔊 未收到音频数据: reqid=%s", req_id)
+                    return TTSResult.from_error(-1, "未收到音频数据", req_id)
                     
-                    saved_path = None
-                    if output_path:
-                        saved_path = self._save_audio(audio_data, output_path, config.encoding)
+                logger.info("🔊 [Auto] 合成成功: reqid=%s..., version=%s, size=%s bytes", req_id[:8], version, sink.size)
                     
-                    return TTSResult.from_success(
-                        audio_data=audio_data,
-                        request_id=req_id,
-                        audio_path=saved_path,
-                    )
+                return TTSResult.from_success(
+                    audio_data=sink.commit(),
+                    request_id=req_id,
+                    audio_path=saved_path,
+                )
                 
         except httpx.TimeoutException:
-            logger.error(f"🔊 请求超时: reqid={req_id}")
+            logger.error("🔊 请求超时: reqid=%s", req_id)
             return TTSResult.from_error(-1, "请求超时", req_id)
         except httpx.HTTPError as e:
-            logger.error(f"🔊 HTTP 错误: {e}")
+            logger.error("🔊 HTTP 错误: %s", e)
             return TTSResult.from_error(-1, f"HTTP 错误: {str(e)}", req_id)
         except Exception as e:
-            logger.error(f"🔊 未知错误: {e}")
+            logger.error("🔊 未知错误: %s", e)
             return TTSResult.from_error(-1, f"未知错误: {str(e)}", req_id)
 
     def _synthesize_auto_with_resource(
@@ -551,75 +852,111 @@ class DoubaoTTSService:
         output_path: Optional[str],
         version: str,
         resource_id: str,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
     ) -> TTSResult:
-        req_id = str(uuid.uuid4())
+        req_id = _new_request_id()
+        saved_path = self._resolve_audio_path(output_path, config.encoding) if output_path else None
         payload = self._build_request_payload(text, config, version=version)
 
         logger.info(
-            f"🔊 [Auto-Retry] 开始合成: reqid={req_id[:8]}..., version={version}, resource_id={resource_id}, voice={config.voice_type}"
+            "🔊 [Auto-Retry] 开始合成: reqid=%s..., version=%s, resource_id=%s, voice=%s",
+            req_id[:8], version, resource_id, config.voice_type,
         )
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                with client.stream(
-                    "POST",
-                    self.API_URL,
-                    headers=self._get_headers(req_id, resource_id=resource_id),
-                    json=payload,
-                ) as response:
-                    if response.status_code != 200:
-                        error_text = response.read().decode("utf-8", errors="ignore")
-                        logger.error(
-                            f"🔊 [Auto-Retry] HTTP 错误: status={response.status_code}, body={error_text[:200]}"
-                        )
-                        _, _, app_id_source, access_token_source = self._resolve_credentials_for_resource(resource_id)
-                        return TTSResult.from_error(
-                            response.status_code,
-                            f"HTTP {response.status_code}: {error_text[:200]} (resource_id={resource_id}, app_id_source={app_id_source}, access_token_source={access_token_source})",
-                            req_id,
-                        )
-
-                    audio_chunks = []
-                    last_error = None
-
-                    for line in response.iter_lines():
-                        if not line:
-                            continue
-                        try:
-                            data = json.loads(line)
-                            code = data.get("code", 0)
-                            message = data.get("message", "")
-
-                            if code == 20000000:
-                                break
-                            if code != 0:
-                                last_error = (code, message)
-                                break
-                            audio_base64 = data.get("data")
-                            if audio_base64:
-                                audio_chunks.append(base64.b64decode(audio_base64))
-                        except json.JSONDecodeError:
-                            continue
-
-                    if last_error:
-                        return TTSResult.from_error(last_error[0], last_error[1], req_id)
-                    if not audio_chunks:
-                        return TTSResult.from_error(-1, "未收到音频数据", req_id)
+            client = _get_http_client()
+            with client.stream(
+                "POST",
+                self.API_URL,
+                headers=self._get_headers(req_id, resource_id=resource_id),
+                content=payload,
+                timeout=self.timeout,
+            ) as response, _AudioSink(saved_path, on_chunk) as sink:
+                if response.status_code != 200:
+                    error_text = response.read().decode("utf-8", errors="ignore")
+                    logger.error(
+                        "🔊 [Auto-Retry] HTTP 错误: status=%s, body=%s",
+                        response.status_code, error_text[:200],
+                    )
+                    _, _, app_id_source, access_token_source = self._resolve_credentials_for_resource(resource_id)
+                    return TTSResult.from_error(
+                        response.status_code,
+                        f"HTTP {response.status_code}: {error_text[:200]} (resource_id={resource_id}, app_id_source={app_id_source}, access_token_source={access_token_source})",
+                        req_id,
+                    )
 
-                    audio_data = b"".join(audio_chunks)
-                    saved_path = None
-                    if output_path:
-                        saved_path = self._save_audio(audio_data, output_path, config.encoding)
+                last_error = _consume_stream(response, sink)
+                
+                if last_error:
+                    return TTSResult.from_error(last_error[0], last_error[1], req_id)
+                if not sink.size:
+                    return TTSResult.from_error(-1, "未收到音频数据", req_id)
 
-                    return TTSResult.from_success(
-                        audio_data=audio_data,
-                        request_id=req_id,
-                        audio_path=saved_path,
-                    )
+                return TTSResult.from_success(
+                    audio_data=sink.commit(),
+                    request_id=req_id,
+                    audio_path=saved_path,
+                )
         except Exception as e:
             return TTSResult.from_error(-1, f"未知错误: {str(e)}", req_id)
 
     
+    def _synthesize_speculative(
+        self,
+        text: str,
+        config: TTSConfig,
+        output_path: Optional[str],
+        version: str,
+        resource_id: str,
+        alt_resource_id: str,
+    ) -> TTSResult:
+        """
+        同时用两个资源 ID 合成，返回先成功的结果；都失败时返回主资源的错误
+        
+        两路各自写入独立的临时文件，只把胜出一方移动到 output_path；
+        落后的一方完成后删除它自己的文件，不会覆盖胜出结果。
+        """
+        final_path = self._resolve_audio_path(output_path, config.encoding) if output_path else None
+        
+        def attempt_path() -> Optional[str]:
+            if final_path is None:
+                return None
+            base, ext = os.path.splitext(final_path)
+            return f"{base}.{os.urandom(4).hex()}.spec{ext}"
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        futures = {
+            executor.submit(
+                self._synthesize_auto_with_resource, text, config, attempt_path(), version, rid
+            ): rid
+            for rid in (resource_id, alt_resource_id)
+        }
+        # 不等待落后的请求：资源不匹配的一方通常会很快返回错误
+        executor.shutdown(wait=False)
+        
+        winner = None
+        errors = {}
+        for future in as_completed(futures):
+            result = future.result()
+            if result.success:
+                winner = future
+                break
+            errors[futures[future]] = result
+        
+        for future in futures:
+            if future is not winner:
+                future.add_done_callback(_discard_speculative_audio)
+        
+        if winner is None:
+            return errors[resource_id]
+        
+        logger.info("🔊 [Auto-Speculative] 采用 resource_id=%s", futures[winner])
+        result = winner.result()
+        if final_path and result.audio_path:
+            os.replace(result.audio_path, final_path)
+            result = replace(result, audio_path=final_path)
+        return result
+    
     async def synthesize_async(
         self,
         text: str,
@@ -637,19 +974,22 @@ class DoubaoTTSService:
         Returns:
             TTSResult: 合成结果
         """
-        req_id = str(uuid.uuid4())
+        req_id = _new_request_id()
+        saved_path = self._resolve_audio_path(output_path, config.encoding) if output_path else None
         payload = self._build_request_payload(text, config)
         
-        logger.info(f"🔊 [异步] 开始合成: reqid={req_id[:8]}..., voice={config.voice_type}")
+        logger.info("🔊 [异步] 开始合成: reqid=%s..., voice=%s", req_id[:8], config.voice_type)
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            client, semaphore = _get_async_http_client()
+            async with semaphore:
                 async with client.stream(
                     "POST",
                     self.API_URL,
                     headers=self._get_headers(req_id),
-                    json=payload,
-                ) as response:
+                    content=payload,
+                    timeout=self.timeout,
+                ) as response, _AudioSink(saved_path) as sink:
                     log_id = response.headers.get("X-Tt-Logid", "")
                     
                     if response.status_code != 200:
@@ -660,49 +1000,18 @@ class DoubaoTTSService:
                             req_id,
                         )
                     
-                    audio_chunks = []
-                    last_error = None
-                    
-                    async for line in response.aiter_lines():
-                        if not line:
-                            continue
-                        
-                        try:
-                            data = json.loads(line)
-                            code = data.get("code", 0)
-                            message = data.get("message", "")
-                            
-                            if code == 20000000:
-                                break
-                            
-                            if code != 0:
-                                last_error = (code, message)
-                                break
-                            
-                            audio_base64 = data.get("data")
-                            if audio_base64:
-                                audio_chunk = base64.b64decode(audio_base64)
-                                audio_chunks.append(audio_chunk)
-                                
-                        except json.JSONDecodeError:
-                            continue
+                    last_error = await _consume_stream_async(response, sink)
                     
                     if last_error:
                         return TTSResult.from_error(last_error[0], last_error[1], req_id)
                     
-                    if not audio_chunks:
+                    if not sink.size:
                         return TTSResult.from_error(-1, "未收到音频数据", req_id)
                     
-                    audio_data = b"".join(audio_chunks)
-                    
-                    logger.info(f"🔊 [异步] 合成成功: reqid={req_id[:8]}..., size={len(audio_data)} bytes")
-                    
-                    saved_path = None
-                    if output_path:
-                        saved_path = self._save_audio(audio_data, output_path, config.encoding)
+                    logger.info("🔊 [异步] 合成成功: reqid=%s..., size=%s bytes", req_id[:8], sink.size)
                     
                     return TTSResult.from_success(
-                        audio_data=audio_data,
+                        audio_data=await sink.acommit(),
                         request_id=req_id,
                         audio_path=saved_path,
                     )
@@ -714,9 +1023,41 @@ class DoubaoTTSService:
         except Exception as e:
             return TTSResult.from_error(-1, f"未知错误: {str(e)}", req_id)
     
+    async def synthesize_batch(
+        self,
+        texts: list[str],
+        config: TTSConfig,
+        output_paths: Optional[list[Optional[str]]] = None,
+        max_concurrency: int = 8,
+    ) -> list[TTSResult]:
+        """
+        异步并发合成多句语音
+        
+        各句通过 asyncio.gather 同时发起，最多 max_concurrency 句在途，结果顺序与 texts 一致。
+        
+        Args:
+            texts: 要合成的文本列表
+            config: TTS 配置（各句共用）
+            output_paths: 与 texts 一一对应的输出路径 (可选)
+            max_concurrency: 最大并发请求数
+        
+        Returns:
+            与 texts 顺序一致的 TTSResult 列表
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        paths = output_paths or [None] * len(texts)
+        
+        async def _synthesize_one(text: str, output_path: Optional[str]) -> TTSResult:
+            async with semaphore:
+                return await self.synthesize_async(text, config, output_path=output_path)
+        
+        return list(await asyncio.gather(*(
+            _synthesize_one(text, path) for text, path in zip(texts, paths)
+        )))
+    
     def _save_audio(
         self,
-        audio_data: bytes,
+        audio_data: Union[bytes, bytearray],
         output_path: str,
         encoding: AudioEncoding,
     ) -> str:
@@ -731,28 +1072,23 @@ class DoubaoTTSService:
         Returns:
             实际保存的文件路径
         """
-        path = Path(output_path)
-        
-        # 确保目录存在
-        path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 添加正确的扩展名
-        ext_map = {
-            AudioEncoding.MP3: ".mp3",
-            AudioEncoding.WAV: ".wav",
-            AudioEncoding.PCM: ".pcm",
-            AudioEncoding.OGG_OPUS: ".ogg",
-        }
-        expected_ext = ext_map.get(encoding, ".mp3")
-        
-        if not path.suffix or path.suffix.lower() != expected_ext:
-            path = path.with_suffix(expected_ext)
+        path = self._resolve_audio_path(output_path, encoding)
+        _ensure_parent_dir(path)
         
         with open(path, "wb") as f:
             f.write(audio_data)
         
-        logger.info(f"🔊 音频已保存: {path}")
-        return str(path)
+        logger.info("🔊 音频已保存: %s", path)
+        return path
+    
+    @staticmethod
+    def _resolve_audio_path(output_path: str, encoding: AudioEncoding) -> str:
+        """按音频编码修正输出文件扩展名"""
+        expected_ext = _AUDIO_EXTENSIONS.get(encoding, ".mp3")
+        base, ext = os.path.splitext(output_path)
+        if ext.lower() != expected_ext:
+            return base + expected_ext
+        return output_path
     
     def synthesize_to_file(
         self,
@@ -760,45 +1096,113 @@ class DoubaoTTSService:
         config: TTSConfig,
         output_dir: Optional[str] = None,
         filename: Optional[str] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+        context_texts: Optional[list[str]] = None,
+        auto: bool = False,
     ) -> TTSResult:
         """
-        合成语音并保存到文件的便捷方法
+        合成语音并保存到文件的便捷方法（经由合成缓存，相同参数直接复用已合成的音频）
         
         Args:
             text: 要合成的文本
             config: TTS 配置
             output_dir: 输出目录，默认使用临时目录
-            filename: 文件名 (不含扩展名)，默认使用 UUID
+            filename: 文件名 (不含扩展名)，默认随机生成
+            on_chunk: 每收到一段音频时的回调（可选，命中缓存时整段回调一次）
+            context_texts: 上下文指令（auto 为 False 时传给 synthesize）
+            auto: 是否按音色自动选择版本（走 synthesize_auto）
         
         Returns:
             TTSResult: 合成结果，audio_path 包含文件路径
         """
         # 确定输出目录
-        if output_dir:
-            out_dir = Path(output_dir)
-            out_dir.mkdir(parents=True, exist_ok=True)
-        else:
-            out_dir = Path(tempfile.gettempdir()) / "doubao_tts"
-            out_dir.mkdir(parents=True, exist_ok=True)
+        out_dir = Path(output_dir) if output_dir else Path(tempfile.gettempdir()) / "doubao_tts"
+        _ensure_dir(str(out_dir))
         
         # 确定文件名
-        name = filename or str(uuid.uuid4())[:8]
+        name = filename or secrets.token_hex(4)
         
         # 根据编码确定扩展名
-        ext_map = {
-            AudioEncoding.MP3: ".mp3",
-            AudioEncoding.WAV: ".wav",
-            AudioEncoding.PCM: ".pcm",
-            AudioEncoding.OGG_OPUS: ".ogg",
-        }
-        ext = ext_map.get(config.encoding, ".mp3")
+        ext = _AUDIO_EXTENSIONS.get(config.encoding, ".mp3")
         
         output_path = str(out_dir / f"{name}{ext}")
         
-        return self.synthesize(text, config, output_path=output_path)
+        return self._synthesize_cached(
+            text, config, output_path, on_chunk=on_chunk, context_texts=context_texts, auto=auto,
+        )
+    
+    def cache_key(
+        self,
+        text: str,
+        config: TTSConfig,
+        context_texts: Optional[list[str]] = None,
+        auto: bool = False,
+    ) -> str:
+        """
+        合成缓存键：请求体 + 资源 ID
+        
+        文本、音色、编码、语速、情绪、上下文等任一参数不同都不会误命中；
+        auto 为 True 时按 synthesize_auto 选用的版本和资源计算。
+        """
+        config.voice_type = _normalize_voice_type(config.voice_type)
+        if auto:
+            version = config.api_version or detect_voice_version(config.voice_type)
+            payload = self._build_request_payload(text, config, version=version)
+            resource_id = get_resource_id(version, is_clone=_is_clone_voice(config.voice_type))
+        else:
+            payload = self._build_request_payload(text, config, context_texts=context_texts)
+            resource_id = self.resource_id
+        return synthesis_cache_key(payload.decode("utf-8"), resource_id)
+    
+    def _synthesize_cached(
+        self,
+        text: str,
+        config: TTSConfig,
+        output_path: str,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+        context_texts: Optional[list[str]] = None,
+        auto: bool = False,
+    ) -> TTSResult:
+        """
+        带磁盘缓存的合成（auto 为 True 时走 synthesize_auto，否则走 synthesize）
+        
+        所有可复用结果的合成入口都经由这里，共用同一套缓存键和淘汰策略。
+        """
+        output_path = self._resolve_audio_path(output_path, config.encoding)
+        key = self.cache_key(text, config, context_texts=context_texts, auto=auto)
+        
+        if fetch_cached_audio(key, output_path):
+            logger.info("🔊 命中合成缓存: %s", output_path)
+            if on_chunk is not None:
+                with open(output_path, "rb") as f:
+                    on_chunk(f.read())
+            metadata = fetch_cached_metadata(key)
+            return TTSResult(
+                success=True,
+                audio_path=output_path,
+                duration_ms=metadata.get("duration_ms"),
+                request_id=metadata.get("request_id"),
+                cached=True,
+            )
+        
+        if auto:
+            result = self.synthesize_auto(text, config, output_path=output_path, on_chunk=on_chunk)
+        else:
+            result = self.synthesize(text, config, output_path=output_path, context_texts=context_texts, on_chunk=on_chunk)
+        if result.success and result.audio_path:
+            store_cached_audio(
+                key, result.audio_path, {"request_id": result.request_id, "duration_ms": result.duration_ms},
+            )
+        return result
 
 
 # 便捷函数
+@lru_cache(maxsize=8)
+def _get_quick_service(app_id: Optional[str], access_token: Optional[str]) -> DoubaoTTSService:
+    """按凭证复用服务实例（凭证解析和请求头模板只做一次）"""
+    return DoubaoTTSService(app_id=app_id, access_token=access_token)
+
+
 def quick_synthesize(
     text: str,
     voice_type: str,
@@ -837,7 +1241,7 @@ def quick_synthesize(
             print(f"音频已保存到: {result.audio_path}")
         ```
     """
-    service = DoubaoTTSService(app_id=app_id, access_token=access_token)
+    service = _get_quick_service(app_id, access_token)
     
     config = TTSConfig(
         voice_type=voice_type,
@@ -845,19 +1249,23 @@ def quick_synthesize(
         speed_ratio=speed_ratio,
     )
     
-    return service.synthesize(text, config, output_path=output_path)
+    if output_path:
+        return service._synthesize_cached(text, config, output_path)
+    return service.synthesize(text, config)
 
 
 # ============================================================================
 # 多轮对话TTS会话管理
 # ============================================================================
 
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List
-from datetime import datetime, timedelta
+from typing import Deque, List
+import time
+from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class TTSSynthesisItem:
     """单次合成记录"""
     index: int                      # 序号
@@ -914,6 +1322,12 @@ class MultiTurnTTSSession:
     MAX_CONTEXT_ROUNDS = 30     # 最多保留30轮上下文
     MAX_CONTEXT_MINUTES = 10    # 上下文最长有效10分钟
     
+    # 后台预合成的线程数
+    PREFETCH_WORKERS = 2
+    
+    # 历史记录最多保留条数（超出后淘汰最早的记录，避免长会话内存持续增长）
+    MAX_HISTORY_ITEMS = 1000
+    
     def __init__(
         self,
         tts_service: DoubaoTTSService,
@@ -928,11 +1342,77 @@ class MultiTurnTTSSession:
         """
         self.tts = tts_service
         self.output_dir = output_dir
-        self.history: List[TTSSynthesisItem] = []
-        self._session_start_time = datetime.now()
+        self.history: Deque[TTSSynthesisItem] = deque(maxlen=self.MAX_HISTORY_ITEMS)
+        self._next_index = 1
+        self._session_start_time = time.monotonic()
         
         # 2.0上下文链：只记录2.0音色的session_id
         self._v2_session_chain: List[str] = []
+        
+        # 摘要统计，随 synthesize 增量维护
+        self._v1_count = 0
+        self._v2_count = 0
+        self._success_count = 0
+        
+        # 预合成：(文本, 音色, 情绪, 强度, 语速, 文件名) -> 后台合成任务
+        self._prefetched: dict[tuple, Future] = {}
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
+    
+    def prefetch(
+        self,
+        text: str,
+        voice_type: str,
+        emotion: Optional[str] = None,
+        emotion_scale: Optional[float] = None,
+        speed_ratio: float = 1.0,
+        output_filename: Optional[str] = None,
+    ) -> bool:
+        """
+        在后台预先合成之后很可能请求的句子，随后以相同参数调用 synthesize 时直接取用结果
+        
+        仅支持1.0音色：2.0音色依赖上一句的 section_id，无法提前合成。
+        
+        Returns:
+            是否已提交预合成
+        """
+        if detect_voice_version(voice_type) != "1.0":
+            return False
+        key = (text, voice_type, emotion, emotion_scale, speed_ratio, output_filename)
+        if key in self._prefetched:
+            return True
+        
+        config = TTSConfig(voice_type=voice_type, speed_ratio=speed_ratio)
+        if emotion:
+            config.emotion = emotion
+            config.emotion_scale = emotion_scale
+        
+        output_path = None
+        if self.output_dir:
+            # 未指定文件名时先写到临时名，取用时再移动到该轮的默认文件名
+            name = output_filename or f"prefetch_{os.urandom(4).hex()}.mp3"
+            output_path = os.path.join(self.output_dir, name)
+        
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(max_workers=self.PREFETCH_WORKERS)
+        self._prefetched[key] = self._prefetch_executor.submit(
+            self.tts.synthesize_auto, text, config, output_path=output_path
+        )
+        return True
+    
+    def _take_prefetched(self, key: tuple, output_path: Optional[str]) -> Optional[TTSResult]:
+        """取出预合成结果；未预合成或预合成失败时返回 None"""
+        future = self._prefetched.pop(key, None)
+        if future is None:
+            return None
+        result = future.result()
+        if not result.success:
+            return None
+        if output_path and result.audio_path:
+            output_path = self.tts._resolve_audio_path(output_path, AudioEncoding.MP3)
+            if result.audio_path != output_path:
+                os.replace(result.audio_path, output_path)
+                result = replace(result, audio_path=output_path)
+        return result
     
     def synthesize(
         self,
@@ -943,6 +1423,8 @@ class MultiTurnTTSSession:
         emotion_scale: Optional[float] = None,      # 1.0情绪强度
         speed_ratio: float = 1.0,
         output_filename: Optional[str] = None,
+        on_chunk: Optional[Callable[[bytes], None]] = None,
+        upcoming: Optional[list[dict]] = None,
     ) -> TTSResult:
         """
         合成一句语音，自动处理版本和上下文
@@ -955,6 +1437,8 @@ class MultiTurnTTSSession:
             emotion_scale: 1.0情绪强度，1-5
             speed_ratio: 语速，0.1-2.0
             output_filename: 输出文件名（不含路径），如果设置output_dir则自动保存
+            on_chunk: 每收到一段音频时的回调，可转发给播放队列（可选）
+            upcoming: 接下来很可能合成的句子（参数同 prefetch 的 dict 列表），在本句合成的同时后台预合成
             
         Returns:
             TTSResult: 合成结果
@@ -962,6 +1446,9 @@ class MultiTurnTTSSession:
         # 检测版本
         version = detect_voice_version(voice_type)
         
+        for spec in upcoming or ():
+            self.prefetch(**spec)
+        
         # 检查上下文是否过期
         self._cleanup_expired_context()
         
@@ -981,13 +1468,13 @@ class MultiTurnTTSSession:
                 config.context_texts = [emotion_instruction]
             if last_v2_session:
                 config.section_id = last_v2_session
-            logger.info(f"🎭 [多轮] 2.0模式: instruction='{emotion_instruction}', section_id={last_v2_session[:8] if last_v2_session else 'None'}...")
+            logger.info("🎭 [多轮] 2.0模式: instruction='%s', section_id=%s...", emotion_instruction, last_v2_session[:8] if last_v2_session else 'None')
         else:
             # 1.0：使用emotion参数
             if emotion:
                 config.emotion = emotion
                 config.emotion_scale = emotion_scale
-            logger.info(f"🎭 [多轮] 1.0模式: emotion={emotion}, scale={emotion_scale}")
+            logger.info("🎭 [多轮] 1.0模式: emotion=%s, scale=%s", emotion, emotion_scale)
         
         # 确定输出路径
         output_path = None
@@ -995,14 +1482,26 @@ class MultiTurnTTSSession:
             output_path = str(Path(self.output_dir) / output_filename)
         elif self.output_dir:
             # 自动生成文件名
-            output_path = str(Path(self.output_dir) / f"turn_{len(self.history) + 1:03d}.mp3")
+            output_path = str(Path(self.output_dir) / f"turn_{self._next_index:03d}.mp3")
         
         # 调用合成
-        result = self.tts.synthesize_auto(text, config, output_path=output_path)
+        result = None
+        if version == "1.0" and self._prefetched:
+            result = self._take_prefetched(
+                (text, voice_type, emotion, emotion_scale, speed_ratio, output_filename), output_path
+            )
+            if result is not None and on_chunk is not None:
+                if result.audio_path:
+                    with open(result.audio_path, "rb") as f:
+                        on_chunk(f.read())
+                elif result.audio_data:
+                    on_chunk(result.audio_data)
+        if result is None:
+            result = self.tts.synthesize_auto(text, config, output_path=output_path, on_chunk=on_chunk)
         
         # 记录历史
         item = TTSSynthesisItem(
-            index=len(self.history) + 1,
+            index=self._next_index,
             text=text,
             voice_type=voice_type,
             version=version,
@@ -1013,6 +1512,12 @@ class MultiTurnTTSSession:
             success=result.success,
         )
         self.history.append(item)
+        self._next_index += 1
+        if version == "2.0":
+            self._v2_count += 1
+        else:
+            self._v1_count += 1
+        self._success_count += result.success
         
         # 如果是2.0且成功，加入上下文链
         if version == "2.0" and result.success and result.request_id:
@@ -1029,28 +1534,51 @@ class MultiTurnTTSSession:
             return
         
         # 检查是否超过10分钟
-        elapsed = datetime.now() - self._session_start_time
-        if elapsed > timedelta(minutes=self.MAX_CONTEXT_MINUTES):
-            logger.info(f"🔄 [多轮] 上下文已过期({elapsed.seconds // 60}分钟)，重置会话")
+        # 单调时钟：不受系统时间调整影响
+        elapsed = time.monotonic() - self._session_start_time
+        if elapsed > self.MAX_CONTEXT_MINUTES * 60:
+            logger.info("🔄 [多轮] 上下文已过期(%s分钟)，重置会话", int(elapsed // 60))
             self.reset_context()
     
     def reset_context(self):
         """重置上下文链（保留历史记录）"""
         self._v2_session_chain = []
-        self._session_start_time = datetime.now()
+        self._session_start_time = time.monotonic()
         logger.info("🔄 [多轮] 上下文已重置")
     
+    def _discard_prefetched(self):
+        """取消并丢弃所有未取用的预合成任务"""
+        for future in self._prefetched.values():
+            future.cancel()
+        self._prefetched.clear()
+    
+    def close(self):
+        """关闭会话：取消未取用的预合成任务并关闭后台线程池"""
+        self._discard_prefetched()
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            self._prefetch_executor = None
+    
+    def __enter__(self) -> "MultiTurnTTSSession":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
     def reset(self):
-        """完全重置会话（清除历史和上下文）"""
-        self.history = []
+        """完全重置会话（清除历史、上下文和未取用的预合成任务）"""
+        self._discard_prefetched()
+        self.history.clear()
+        self._next_index = 1
+        self._v1_count = self._v2_count = self._success_count = 0
         self._v2_session_chain = []
-        self._session_start_time = datetime.now()
+        self._session_start_time = time.monotonic()
         logger.info("🔄 [多轮] 会话已完全重置")
     
     @property
     def turn_count(self) -> int:
-        """当前轮次数"""
-        return len(self.history)
+        """当前轮次数（含已从历史记录中淘汰的轮次）"""
+        return self._next_index - 1
     
     @property
     def v2_context_depth(self) -> int:
@@ -1059,16 +1587,12 @@ class MultiTurnTTSSession:
     
     def get_summary(self) -> str:
         """获取会话摘要"""
-        if not self.history:
+        if not self.turn_count:
             return "空会话"
         
-        v1_count = sum(1 for item in self.history if item.version == "1.0")
-        v2_count = sum(1 for item in self.history if item.version == "2.0")
-        success_count = sum(1 for item in self.history if item.success)
-        
         return (
-            f"总轮次: {len(self.history)}, "
-            f"1.0: {v1_count}, 2.0: {v2_count}, "
-            f"成功: {success_count}/{len(self.history)}, "
+            f"总轮次: {self.turn_count}, "
+            f"1.0: {self._v1_count}, 2.0: {self._v2_count}, "
+            f"成功: {self._success_count}/{self.turn_count}, "
             f"上下文深度: {self.v2_context_depth}"
         )
@@ -35,6 +35,7 @@ def main():
     
     try:
         import uvicorn
+        from backend.config import SERVER_LOOP, SERVER_HTTP
         
         logger.info(f"🚀 TTS Agent 服务启动中...")
         logger.info(f"🌐 访问地址: http://{args.host}:{args.port}")
@@ -45,6 +46,9 @@ def main():
             host=args.host,
             port=args.port,
             reload=args.reload,
+            loop=SERVER_LOOP,
+            http=SERVER_HTTP,
+            access_log=args.reload,
             log_level="info",
         )
     except ImportError as e:
@@ -6,15 +6,27 @@ TTS Agent API 接口测试脚本
 1. 创建会话
 2. 对话分析（推理）
 3. 会话列表
+4. 并发压测（对话分析接口 p50/p99 延迟）
 """
 
-import requests
+import asyncio
 import json
+import math
 import time
 from datetime import datetime
 
+import httpx
+
 BASE_URL = "http://127.0.0.1:8766"
 
+# 并发压测的请求数
+CONCURRENCY = 16
+
+# 对话分析接口的测试输入
+ANALYZE_INPUT = """小明：今天天气真好啊！
+小红：是啊，我们去公园玩吧。
+小明：好主意！我去拿野餐垫。"""
+
 # 测试结果收集
 results = []
 
@@ -36,40 +48,40 @@ def log_result(test_name: str, success: bool, details: dict = None, error: str =
     if error:
         print(f"   错误: {error}")
 
-def test_health():
+async def test_health(cli: httpx.AsyncClient):
     """测试健康检查接口"""
-    start = time.time()
+    start = time.monotonic()
     try:
-        resp = requests.get(f"{BASE_URL}/api/health")
-        duration = time.time() - start
+        resp = await cli.get("/api/health")
+        duration = time.monotonic() - start
         
         if resp.status_code == 200 and resp.json().get("status") == "ok":
             log_result("健康检查 /api/health", True, resp.json(), duration=duration)
         else:
             log_result("健康检查 /api/health", False, error=f"状态码: {resp.status_code}", duration=duration)
     except Exception as e:
-        log_result("健康检查 /api/health", False, error=str(e), duration=time.time() - start)
+        log_result("健康检查 /api/health", False, error=str(e), duration=time.monotonic() - start)
 
-def test_tts_health():
+async def test_tts_health(cli: httpx.AsyncClient):
     """测试 TTS 健康检查接口"""
-    start = time.time()
+    start = time.monotonic()
     try:
-        resp = requests.get(f"{BASE_URL}/api/tts/health")
-        duration = time.time() - start
+        resp = await cli.get("/api/tts/health")
+        duration = time.monotonic() - start
         
         if resp.status_code == 200:
             log_result("TTS 健康检查 /api/tts/health", True, resp.json(), duration=duration)
         else:
             log_result("TTS 健康检查 /api/tts/health", False, error=f"状态码: {resp.status_code}", duration=duration)
     except Exception as e:
-        log_result("TTS 健康检查 /api/tts/health", False, error=str(e), duration=time.time() - start)
+        log_result("TTS 健康检查 /api/tts/health", False, error=str(e), duration=time.monotonic() - start)
 
-def test_create_session():
+async def test_create_session(cli: httpx.AsyncClient):
     """测试创建会话接口"""
-    start = time.time()
+    start = time.monotonic()
     try:
-        resp = requests.post(f"{BASE_URL}/api/tts/sessions", json={})
-        duration = time.time() - start
+        resp = await cli.post("/api/tts/sessions", json={})
+        duration = time.monotonic() - start
         
         data = resp.json()
         if resp.status_code == 200 and data.get("success") and data.get("session_id"):
@@ -82,15 +94,15 @@ def test_create_session():
             log_result("创建会话 POST /api/tts/sessions", False, error=str(data), duration=duration)
             return None
     except Exception as e:
-        log_result("创建会话 POST /api/tts/sessions", False, error=str(e), duration=time.time() - start)
+        log_result("创建会话 POST /api/tts/sessions", False, error=str(e), duration=time.monotonic() - start)
         return None
 
-def test_get_session(session_id: str):
+async def test_get_session(cli: httpx.AsyncClient, session_id: str):
     """测试获取会话详情"""
-    start = time.time()
+    start = time.monotonic()
     try:
-        resp = requests.get(f"{BASE_URL}/api/tts/sessions/{session_id}")
-        duration = time.time() - start
+        resp = await cli.get(f"/api/tts/sessions/{session_id}")
+        duration = time.monotonic() - start
         
         data = resp.json()
         if resp.status_code == 200 and data.get("success"):
@@ -103,29 +115,24 @@ def test_get_session(session_id: str):
         else:
             log_result(f"获取会话详情 GET /api/tts/sessions/{session_id[:8]}...", False, error=str(data), duration=duration)
     except Exception as e:
-        log_result(f"获取会话详情", False, error=str(e), duration=time.time() - start)
+        log_result(f"获取会话详情", False, error=str(e), duration=time.monotonic() - start)
 
-def test_analyze_dialogue(session_id: str):
+async def test_analyze_dialogue(cli: httpx.AsyncClient, session_id: str):
     """测试对话分析（推理）接口"""
-    start = time.time()
-    test_input = """小明：今天天气真好啊！
-小红：是啊，我们去公园玩吧。
-小明：好主意！我去拿野餐垫。"""
-    
+    start = time.monotonic()
     try:
-        resp = requests.post(
-            f"{BASE_URL}/api/tts/sessions/{session_id}/analyze",
-            json={"user_input": test_input},
-            timeout=120  # LLM 调用可能需要较长时间
+        resp = await cli.post(
+            f"/api/tts/sessions/{session_id}/analyze",
+            json={"user_input": ANALYZE_INPUT},
         )
-        duration = time.time() - start
+        duration = time.monotonic() - start
         
         data = resp.json()
         if resp.status_code == 200 and data.get("success"):
             dialogue_list = data.get("dialogue_list", [])
             log_result(f"对话分析（推理） POST /api/tts/sessions/.../analyze", True, {
                 "dialogue_count": len(dialogue_list),
-                "characters": list(set(d.get("character", "") for d in dialogue_list)),
+                "characters": list(dict.fromkeys(d.get("character", "") for d in dialogue_list)),
                 "sample": dialogue_list[0] if dialogue_list else None,
             }, duration=duration)
             return True
@@ -134,15 +141,15 @@ def test_analyze_dialogue(session_id: str):
                       error=data.get("detail", str(data)), duration=duration)
             return False
     except Exception as e:
-        log_result(f"对话分析（推理）", False, error=str(e), duration=time.time() - start)
+        log_result(f"对话分析（推理）", False, error=str(e), duration=time.monotonic() - start)
         return False
 
-def test_list_sessions():
+async def test_list_sessions(cli: httpx.AsyncClient):
     """测试会话列表接口"""
-    start = time.time()
+    start = time.monotonic()
     try:
-        resp = requests.get(f"{BASE_URL}/api/tts/sessions")
-        duration = time.time() - start
+        resp = await cli.get("/api/tts/sessions")
+        duration = time.monotonic() - start
         
         data = resp.json()
         if resp.status_code == 200 and data.get("success"):
@@ -157,15 +164,15 @@ def test_list_sessions():
             log_result("会话列表 GET /api/tts/sessions", False, error=str(data), duration=duration)
             return []
     except Exception as e:
-        log_result("会话列表 GET /api/tts/sessions", False, error=str(e), duration=time.time() - start)
+        log_result("会话列表 GET /api/tts/sessions", False, error=str(e), duration=time.monotonic() - start)
         return []
 
-def test_list_voices():
+async def test_list_voices(cli: httpx.AsyncClient):
     """测试音色列表接口"""
-    start = time.time()
+    start = time.monotonic()
     try:
-        resp = requests.get(f"{BASE_URL}/api/tts/voices?limit=5")
-        duration = time.time() - start
+        resp = await cli.get("/api/tts/voices?limit=5")
+        duration = time.monotonic() - start
         
         data = resp.json()
         if resp.status_code == 200 and data.get("success"):
@@ -177,9 +184,48 @@ def test_list_voices():
         else:
             log_result("音色列表 GET /api/tts/voices", False, error=str(data), duration=duration)
     except Exception as e:
-        log_result("音色列表 GET /api/tts/voices", False, error=str(e), duration=time.time() - start)
+        log_result("音色列表 GET /api/tts/voices", False, error=str(e), duration=time.monotonic() - start)
+
+def _percentile(values: list, p: float) -> float:
+    """最近秩法求百分位（values 需已排序）"""
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+async def test_concurrency(cli: httpx.AsyncClient, n: int = CONCURRENCY):
+    """并发压测：同时发起 n 个对话分析请求，统计 p50/p99 延迟"""
+    start = time.monotonic()
+    try:
+        # 每个请求使用独立会话，避免同一会话内的分析互相覆盖
+        created = await asyncio.gather(*(cli.post("/api/tts/sessions", json={}) for _ in range(n)))
+        session_ids = [r.json().get("session_id") for r in created if r.status_code == 200]
+        if len(session_ids) < n:
+            log_result(f"并发压测 x{n}", False, error=f"仅创建 {len(session_ids)}/{n} 个会话",
+                       duration=time.monotonic() - start)
+            return
+
+        async def analyze(session_id: str):
+            t0 = time.monotonic()
+            resp = await cli.post(f"/api/tts/sessions/{session_id}/analyze", json={"user_input": ANALYZE_INPUT})
+            return resp.status_code == 200 and resp.json().get("success"), time.monotonic() - t0
+
+        start = time.monotonic()
+        outcomes = await asyncio.gather(*(analyze(sid) for sid in session_ids), return_exceptions=True)
+        duration = time.monotonic() - start
 
-def generate_report():
+        latencies = sorted(o[1] for o in outcomes if not isinstance(o, BaseException) and o[0])
+        failed = n - len(latencies)
+        details = {"requests": n, "succeeded": len(latencies), "failed": failed}
+        if latencies:
+            details.update({
+                "p50_ms": round(_percentile(latencies, 0.5) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2),
+            })
+        log_result(f"并发压测 x{n} POST /api/tts/sessions/.../analyze", failed == 0, details,
+                   error=f"{failed} 个请求失败" if failed else None, duration=duration)
+    except Exception as e:
+        log_result(f"并发压测 x{n}", False, error=str(e), duration=time.monotonic() - start)
+
+def generate_report(wall_time: float):
     """生成测试报告"""
     print("\n" + "=" * 60)
     print("                    测试报告")
@@ -197,7 +243,8 @@ def generate_report():
     print(f"   通过: {passed} ✅")
     print(f"   失败: {failed} ❌")
     print(f"   通过率: {passed/len(results)*100:.1f}%")
-    print(f"   总耗时: {total_time:.2f}ms")
+    print(f"   累计耗时: {total_time:.2f}ms")
+    print(f"   实际耗时: {wall_time * 1000:.2f}ms")
     
     print("\n📋 测试详情:")
     print("-" * 60)
@@ -216,6 +263,36 @@ def generate_report():
     
     print("=" * 60)
 
+async def run_tests():
+    """执行全部测试（互不依赖的接口并发执行）"""
+    # LLM 调用可能需要较长时间
+    async with httpx.AsyncClient(base_url=BASE_URL, http2=True, timeout=120) as cli:
+        # 1. 健康检查 / 音色列表 / 会话列表（互不依赖，并发执行）
+        print("\n🔍 测试健康检查、音色列表、会话列表接口...")
+        await asyncio.gather(test_health(cli), test_tts_health(cli), test_list_voices(cli), test_list_sessions(cli))
+        
+        # 2. 创建会话
+        print("\n🔍 测试创建会话接口...")
+        session_id = await test_create_session(cli)
+        
+        if session_id:
+            # 3. 获取会话详情
+            print("\n🔍 测试获取会话详情接口...")
+            await test_get_session(cli, session_id)
+            
+            # 4. 对话分析（推理）
+            print("\n🔍 测试对话分析（推理）接口...")
+            print("   ⏳ 正在调用 LLM 进行推理，请稍候...")
+            await test_analyze_dialogue(cli, session_id)
+            
+            # 5. 再次获取会话详情（验证对话列表是否生成）
+            print("\n🔍 验证对话列表生成...")
+            await test_get_session(cli, session_id)
+        
+        # 6. 并发压测
+        print(f"\n🔍 并发压测对话分析接口（{CONCURRENCY} 并发）...")
+        await test_concurrency(cli)
+
 def main():
     """主测试流程"""
     print("=" * 60)
@@ -225,39 +302,11 @@ def main():
     print(f"测试服务: {BASE_URL}")
     print("-" * 60)
     
-    # 1. 健康检查
-    print("\n🔍 测试健康检查接口...")
-    test_health()
-    test_tts_health()
-    
-    # 2. 创建会话
-    print("\n🔍 测试创建会话接口...")
-    session_id = test_create_session()
-    
-    if session_id:
-        # 3. 获取会话详情
-        print("\n🔍 测试获取会话详情接口...")
-        test_get_session(session_id)
-        
-        # 4. 对话分析（推理）
-        print("\n🔍 测试对话分析（推理）接口...")
-        print("   ⏳ 正在调用 LLM 进行推理，请稍候...")
-        test_analyze_dialogue(session_id)
-        
-        # 5. 再次获取会话详情（验证对话列表是否生成）
-        print("\n🔍 验证对话列表生成...")
-        test_get_session(session_id)
-    
-    # 6. 会话列表
-    print("\n🔍 测试会话列表接口...")
-    test_list_sessions()
-    
-    # 7. 音色列表
-    print("\n🔍 测试音色列表接口...")
-    test_list_voices()
+    start = time.monotonic()
+    asyncio.run(run_tests())
     
     # 生成报告
-    generate_report()
+    generate_report(time.monotonic() - start)
 
 if __name__ == "__main__":
     main()
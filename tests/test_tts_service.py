@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+DoubaoTTSService 推测重试测试
+"""
+
+import time
+
+import pytest
+
+from backend.models import TTSConfig, TTSResult
+from backend.services.tts_service import DoubaoTTSService
+
+
+@pytest.mark.parametrize("fast, slow", [("primary", "alternate"), ("alternate", "primary")])
+def test_speculative_both_succeed_keeps_winner(tmp_path, monkeypatch, fast, slow):
+    """两路都成功时，落后的一方不能覆盖胜出结果，也不能留下临时文件"""
+
+    def fake_attempt(self, text, config, output_path, version, resource_id, on_chunk=None):
+        if resource_id == slow:
+            time.sleep(0.2)
+        with open(output_path, "wb") as f:
+            f.write(resource_id.encode())
+        return TTSResult.from_success(None, request_id=resource_id, audio_path=output_path)
+
+    monkeypatch.setattr(DoubaoTTSService, "_synthesize_auto_with_resource", fake_attempt)
+
+    output_path = str(tmp_path / "out.mp3")
+    result = DoubaoTTSService()._synthesize_speculative(
+        "你好", TTSConfig(voice_type="custom_voice"), output_path, "1.0", "primary", "alternate",
+    )
+
+    assert result.success
+    assert result.request_id == fast
+    assert result.audio_path == output_path
+
+    # 等落后的一方完成并清理自己的文件
+    deadline = time.monotonic() + 2
+    while len(list(tmp_path.iterdir())) > 1 and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["out.mp3"]
+    assert (tmp_path / "out.mp3").read_bytes() == fast.encode()
@@ -1,11 +1,10 @@
-import json
 import logging
 import os
 import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
 
+import orjson
 from agentkit.apps import AgentkitSimpleApp
 
 try:
@@ -49,11 +48,13 @@ def _create_api_app():
 
     from backend.api import tts_router
     from backend.models import init_database
+    from backend.services import aclose_async_http_client
 
     @asynccontextmanager
     async def lifespan(_app: FastAPI):
         init_database()
         yield
+        await aclose_async_http_client()
 
     api_app = FastAPI(lifespan=lifespan)
     cors_origins_raw = (os.getenv("CORS_ORIGINS") or "").strip()
@@ -84,70 +85,19 @@ def _create_api_app():
     return api_app
 
 
-app.mount("/", _create_api_app())
+class _LazyApiApp:
+    """首个请求到达时才构建 API 应用，模块导入时不加载 FastAPI 路由、ORM 等重依赖"""
 
+    def __init__(self):
+        self._app = None
 
-def _sanitize_object_name(name: str) -> str:
-    import re
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            self._app = _create_api_app()
+        await self._app(scope, receive, send)
 
-    cleaned = re.sub(r"[^0-9A-Za-z._-]+", "_", name.strip())
-    cleaned = cleaned.strip("._-")
-    return cleaned or "file"
 
-
-def _get_tos_client():
-    import tos
-
-    ak = os.getenv("TOS_ACCESS_KEY") or os.getenv("VOLCENGINE_ACCESS_KEY") or ""
-    sk = os.getenv("TOS_SECRET_KEY") or os.getenv("VOLCENGINE_SECRET_KEY") or ""
-    endpoint = os.getenv("TOS_ENDPOINT") or ""
-    region = os.getenv("TOS_REGION") or ""
-
-    if not (ak and sk and endpoint and region):
-        return None
-
-    return tos.TosClientV2(ak, sk, endpoint, region)
-
-
-def _upload_file_to_tos(
-    local_path: str,
-    session_id: str,
-    content_type: Optional[str] = None,
-) -> Optional[dict]:
-    client = _get_tos_client()
-    if client is None:
-        return None
-
-    bucket = os.getenv("TOS_BUCKET") or ""
-    if not bucket:
-        return None
-
-    prefix = (os.getenv("TOS_PREFIX") or "tts-agent-output").strip("/")
-    expires = int(os.getenv("TOS_URL_EXPIRES", "3600"))
-
-    p = Path(local_path)
-    if not p.exists() or not p.is_file():
-        return None
-
-    filename = _sanitize_object_name(p.name)
-    object_key = f"{prefix}/{session_id}/{filename}"
-
-    inferred_ct = content_type
-    if not inferred_ct:
-        ext = p.suffix.lower()
-        if ext == ".mp3":
-            inferred_ct = "audio/mpeg"
-        elif ext == ".wav":
-            inferred_ct = "audio/wav"
-        elif ext == ".ogg":
-            inferred_ct = "audio/ogg"
-        elif ext == ".pcm":
-            inferred_ct = "application/octet-stream"
-
-    client.put_object_from_file(bucket=bucket, key=object_key, file_path=str(p), content_type=inferred_ct)
-    url = client.generate_presigned_url("GET", Bucket=bucket, Key=object_key, ExpiresIn=expires)
-
-    return {"bucket": bucket, "key": object_key, "url": url}
+app.mount("/", _LazyApiApp())
 
 
 def _get_output_dir(session_id: str) -> str:
@@ -160,6 +110,7 @@ def _get_output_dir(session_id: str) -> str:
 @app.entrypoint
 async def run(payload: dict, headers: dict):
     from agent import create_tts_pipeline
+    from backend.services import is_tos_upload_enabled, upload_session_audio
 
     prompt = payload.get("prompt") or payload.get("text") or ""
     prompt = prompt.strip()
@@ -176,14 +127,13 @@ async def run(payload: dict, headers: dict):
     )
 
     logger.info(
-        json.dumps(
+        orjson.dumps(
             {
                 "event": "invoke_start",
                 "session_id": session_id,
                 "user_id": headers.get("user_id", ""),
-            },
-            ensure_ascii=False,
-        )
+            }
+        ).decode("utf-8")
     )
 
     stage1 = await pipeline.stage1_analyze(prompt)
@@ -198,22 +148,14 @@ async def run(payload: dict, headers: dict):
     if not stage3.get("success"):
         return {"success": False, "stage": "synthesize", "session_id": session_id, "error": stage3.get("error")}
 
-    upload_enabled = (os.getenv("TOS_UPLOAD_ENABLED") or "").strip().lower() in {"1", "true", "yes", "on"}
     audio_file_urls = []
     merged_audio_url = None
 
-    if upload_enabled:
-        try:
-            for local_path in stage3.get("audio_files", []) or []:
-                uploaded = _upload_file_to_tos(local_path=local_path, session_id=session_id)
-                if uploaded:
-                    audio_file_urls.append(uploaded)
-
-            merged_path = stage3.get("merged_audio")
-            if merged_path:
-                merged_audio_url = _upload_file_to_tos(local_path=merged_path, session_id=session_id)
-        except Exception as e:
-            logger.exception("tos_upload_failed: %s", str(e))
+    if is_tos_upload_enabled():
+        # 与 API 服务共用缓存的 TOS 客户端和上传逻辑
+        audio_file_urls, merged_audio_url = await upload_session_audio(
+            session_id, stage3.get("audio_files"), stage3.get("merged_audio")
+        )
 
     return {
         "success": True,